@@ -0,0 +1,89 @@
+"""Feature-importance preparation benchmark: per-request rebuild vs the registry store
+
+For every analysis model that can be loaded it times, per page run:
+  legacy_ms   what risk_analysis_engine used to do: build a {feature: importance}
+              dict, wrap it in a DataFrame, sort it, take the top 10 and render the
+              background_gradient Styler
+  store_ms    reading the pre-sorted frame and top 10 from the registry entry
+It also reports the one-off cost of building the store at model load (build_ms).
+Plot rendering is identical in both paths and is not included.
+
+Usage:
+    python benchmarks/bench_feature_importance.py --repeat 200
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+import pandas as pd
+
+from feature_pipeline import MODEL_COLUMNS
+from model_registry import FeatureImportance, registry
+
+MODELS = ["Random Forest", "XGBoost", "Extra Trees"]
+
+def legacy_render(model, columns):
+    """The per-request path the analysis page used before the store existed"""
+    features = {k: float(v) for k, v in zip(columns, model.feature_importances_)}
+    importance = pd.DataFrame({
+        "Feature": features.keys(),
+        "Importance": [float(v) for v in features.values()]
+    }).sort_values("Importance", ascending=False)
+    importance.head(10)
+    importance.style.background_gradient(cmap='Blues').to_html()
+    return importance
+
+def store_render(name):
+    importance = registry.get_importance(name)
+    importance.top(10)
+    return importance.frame, importance.max
+
+def time_ms(fn, repeat):
+    """Median wall time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=100, help="timed iterations per model and path")
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name in MODELS:
+        try:
+            entry = registry.get(name)
+        except RuntimeError as e:
+            print(f"skipping {name}: {e}")
+            continue
+        if entry.importance is None:
+            print(f"skipping {name}: no feature importances")
+            continue
+
+        columns = entry.feature_columns or MODEL_COLUMNS
+        build_ms = time_ms(lambda: FeatureImportance.from_model(entry.model, columns), max(1, args.repeat // 10))
+        legacy_ms = time_ms(lambda: legacy_render(entry.model, columns), args.repeat)
+        store_ms = time_ms(lambda: store_render(name), args.repeat)
+        rows.append({"model": name, "build_ms": build_ms, "legacy_ms": legacy_ms, "store_ms": store_ms,
+                    "saved_ms": legacy_ms - store_ms})
+
+    if not rows:
+        print("No models could be loaded")
+        return 1
+
+    report = pd.DataFrame(rows).set_index("model")
+    print(report.round(3).to_string())
+    # The analysis page renders every model's tab on each run
+    print(f"\nSaved per analysis page run: {report['saved_ms'].sum():.2f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
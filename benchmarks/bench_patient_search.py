@@ -0,0 +1,150 @@
+"""Patient records search latency on a synthetic store
+
+Builds (or reuses) a patient store with --rows assessments spread over two
+years, then times representative Patient Records searches through
+PatientStore.search_assessments: patient ID prefixes, history terms, date
+prefixes, risk level and score ranges, and combinations. Each is timed for
+the first page, for --deep-page reached by OFFSET, and for the same page
+reached by a cursor (the previous page's last row), which is how the records
+page pages. The search and prefix caches are cleared before every timed call,
+so the numbers are for the indexed queries themselves. The run fails if any
+first-page or cursor median exceeds --max-ms.
+
+Usage:
+    python benchmarks/bench_patient_search.py --rows 1000000 --max-ms 50
+    python benchmarks/bench_patient_search.py --db /tmp/records.db --keep
+"""
+import argparse
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from patient_store import PatientStore, history_summary
+
+QUERIES = [
+    "",
+    "PT-0001",
+    "PT-0012",
+    "hyper",
+    "smoker heart",
+    "2025-03",
+    "2025-03-14",
+    "high",
+    "high risk >60%",
+    "<10%",
+    "PT-003 2024",
+    "none >90%",
+    "none >60%",
+    "hyper >45%",
+    "pt >60%",
+    "no 2024",
+    "former 2025-01 low",
+]
+SMOKING = ["never smoked", "formerly smoked", "smokes", "Unknown"]
+
+def synthetic_rows(n, start, seed=0):
+    """Assessment rows in insertion (= time) order after `start`, ~10 assessments per patient"""
+    rng = random.Random(seed)
+    step = timedelta(days=730) / n
+    for i in range(n):
+        data = {
+            'age': rng.randint(18, 90), 'gender': rng.choice(["Male", "Female"]),
+            'hypertension': int(rng.random() < 0.2), 'heart_disease': int(rng.random() < 0.1),
+            'avg_glucose_level': round(rng.uniform(60, 270), 1), 'bmi': round(rng.uniform(16, 45), 1),
+            'smoking_status': rng.choice(SMOKING)
+        }
+        probability = rng.betavariate(1.2, 6)
+        yield (f"PT-{rng.randrange(n // 10 or 1):06d}", (start + step * (i + 1)).isoformat(timespec="seconds"),
+            data['age'], data['gender'], data['hypertension'], data['heart_disease'],
+            data['avg_glucose_level'], data['bmi'], data['smoking_status'], history_summary(data),
+            probability, "High Risk" if probability >= 0.3 else "Low Risk", 0.3)
+
+def populate(store, n):
+    """Append n assessments, dated after the newest stored one (as record_assessment would)"""
+    conn = store.connect()
+    latest = conn.execute("SELECT MAX(assessed_at) FROM assessments").fetchone()[0]
+    start = datetime.fromisoformat(latest) if latest else datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = list(synthetic_rows(n, start))
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO patients (patient_id, created_at, updated_at) VALUES (?, ?, ?)",
+                        {(row[0], row[1], row[1]) for row in rows})
+        conn.executemany(
+            "INSERT INTO assessments (patient_id, assessed_at, age, gender, hypertension, heart_disease, "
+            "avg_glucose_level, bmi, smoking_status, history_summary, probability, risk_level, threshold) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("ANALYZE")
+
+def time_ms(fn, repeat):
+    """Median wall time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db", help="database file (default: a temporary file)")
+    parser.add_argument("--keep", action="store_true", help="keep the database for later runs")
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per query and page")
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--deep-page", type=int, default=400, help="page number timed after the first")
+    parser.add_argument("--max-ms", type=float, default=50.0, help="fail if any median exceeds this")
+    args = parser.parse_args(argv)
+
+    tmp = None
+    if args.db:
+        path = Path(args.db)
+    else:
+        tmp = tempfile.mkdtemp(prefix="patient_search_")
+        path = Path(tmp) / "records.db"
+    store = PatientStore(path)
+    existing = store.count_assessments()
+    if existing < args.rows:
+        start = time.perf_counter()
+        populate(store, args.rows - existing)
+        print(f"built {store.count_assessments():,} assessments in {time.perf_counter() - start:.1f}s "
+            f"(full-text index: {'yes' if store.has_fts else 'no'})")
+
+    report = []
+    for query in QUERIES:
+        row = {"query": query or "(all)"}
+        # Cursor for the deep page: the last row before it
+        before = store.search_assessments(query, limit=1, offset=args.deep_page * args.page_size - 1)[0]
+        for label, page, after in (("first_ms", 0, None), ("deep_ms", args.deep_page, None),
+                                    ("cursor_ms", 0, before[-1] if before else None)):
+            def search():
+                store.search_cache.clear()
+                store.term_cache.clear()
+                return store.search_assessments(query, limit=args.page_size, offset=page * args.page_size,
+                                                after=after)
+            row[label] = time_ms(search, args.repeat)
+        _, total, exact = store.search_assessments(query, limit=args.page_size)
+        row["matches"] = f"{total:,}" if exact else f"{total:,}+"
+        report.append(row)
+
+    print(f"{'query':<22}{'first_ms':>10}{'deep_ms':>10}{'cursor_ms':>10}{'matches':>12}")
+    for row in report:
+        print(f"{row['query']:<22}{row['first_ms']:>10.2f}{row['deep_ms']:>10.2f}{row['cursor_ms']:>10.2f}"
+            f"{row['matches']:>12}")
+    worst = max(max(row['first_ms'], row['cursor_ms']) for row in report)
+    print(f"\nslowest median: {worst:.2f} ms (limit {args.max_ms} ms)")
+
+    if tmp and not args.keep:
+        shutil.rmtree(tmp, ignore_errors=True)
+    elif tmp:
+        print(f"database kept at {path}")
+    return 1 if worst > args.max_ms else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Cold-start benchmark for stroke_predictor_pkl
+
+Each run starts a fresh interpreter and reports, separately:
+  import_s            time to `import stroke_predictor_pkl`
+  first_prediction_s  first predict_stroke_risk call (includes the lazy model load)
+  warm_prediction_s   a second call with the prediction cache cleared (loaded model, no cache hit)
+  cached_prediction_s a third, identical call answered by the prediction cache
+It also lists any plotting/metric modules that the import pulled in, which
+should be none now that they are deferred to plot_model_performance.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --max-import-seconds 1.5   # exit 1 on regression
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+SAMPLE_PATIENT = {
+    'age': 67, 'hypertension': 0, 'heart_disease': 1, 'avg_glucose_level': 228.69,
+    'bmi': 36.6, 'gender': 'Male', 'ever_married': 'Yes', 'work_type': 'Private',
+    'Residence_type': 'Urban', 'smoking_status': 'formerly smoked'
+}
+
+TIMINGS = ("import_s", "first_prediction_s", "warm_prediction_s", "cached_prediction_s")
+HEAVY_MODULES = ["matplotlib", "matplotlib.pyplot", "seaborn", "sklearn.metrics"]
+
+CHILD_CODE = """
+import json, sys, time
+t0 = time.perf_counter()
+import stroke_predictor_pkl
+t1 = time.perf_counter()
+heavy = [m for m in {heavy!r} if m in sys.modules]
+result = stroke_predictor_pkl.predict_stroke_risk({patient!r})
+t2 = time.perf_counter()
+stroke_predictor_pkl.prediction_cache.clear()
+t3 = time.perf_counter()
+stroke_predictor_pkl.predict_stroke_risk({patient!r})
+t4 = time.perf_counter()
+stroke_predictor_pkl.predict_stroke_risk({patient!r})
+t5 = time.perf_counter()
+print(json.dumps({{
+    "import_s": t1 - t0,
+    "first_prediction_s": t2 - t1,
+    "warm_prediction_s": t4 - t3,
+    "cached_prediction_s": t5 - t4,
+    "status": result["status"],
+    "error": result.get("error"),
+    "heavy_modules_on_import": heavy
+}}))
+"""
+
+def run_once():
+    """Time one cold start in a fresh interpreter"""
+    code = CHILD_CODE.format(heavy=HEAVY_MODULES, patient=SAMPLE_PATIENT)
+    completed = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR,
+                            capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def summarize(runs):
+    """Median and min of each timing across runs"""
+    summary = {}
+    for key in TIMINGS:
+        values = [run[key] for run in runs]
+        summary[key] = {"median": statistics.median(values), "min": min(values)}
+    summary["heavy_modules_on_import"] = sorted({m for run in runs for m in run["heavy_modules_on_import"]})
+    summary["prediction_status"] = runs[-1]["status"]
+    if runs[-1]["error"]:
+        summary["prediction_error"] = runs[-1]["error"]
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for stroke_predictor_pkl")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    parser.add_argument("--max-import-seconds", type=float, default=None,
+                        help="Fail if the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    summary = summarize([run_once() for _ in range(args.runs)])
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for key in TIMINGS:
+            print(f"{key:<20} median {summary[key]['median'] * 1000:8.1f} ms   "
+                f"min {summary[key]['min'] * 1000:8.1f} ms")
+        print(f"{'heavy imports':<20} {', '.join(summary['heavy_modules_on_import']) or 'none'}")
+        print(f"{'prediction':<20} {summary['prediction_status']} {summary.get('prediction_error', '')}")
+
+    if args.max_import_seconds is not None and summary["import_s"]["median"] > args.max_import_seconds:
+        print(f"Import time regression: {summary['import_s']['median']:.3f}s > {args.max_import_seconds}s",
+            file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
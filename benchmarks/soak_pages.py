@@ -0,0 +1,121 @@
+"""Soak test for the chart-heavy pages: thousands of headless reruns with bounded RSS
+
+Each page is driven with Streamlit's AppTest (no browser, same process) for
+--runs reruns. The patient is varied on every run so charts keep missing the
+chart cache and new figures are drawn; --no-chart-cache disables the cache so
+every rerun renders every figure. After --warmup runs the resident set size is
+taken as the baseline, and the run fails if it then grows by more than
+--max-growth-mb or if any figure is left open.
+
+Usage:
+    python benchmarks/soak_pages.py --runs 2000
+    python benchmarks/soak_pages.py --pages 03 --runs 5000 --no-chart-cache --max-growth-mb 30
+"""
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from streamlit.testing.v1 import AppTest
+
+from chart_cache import chart_cache, figure_stats
+from model_registry import _current_rss
+from stroke_predictor_pkl import predict_stroke_risk
+
+PAGES = {
+    "02": "pages/02_Patient_Data_Entry.py",
+    "03": "pages/03_Risk_Assessment_Results.py",
+    "04": "pages/04_Model_Performance.py"
+}
+
+BASE_PATIENT = {
+    'age': 67, 'hypertension': 0, 'heart_disease': 1, 'avg_glucose_level': 228.69,
+    'bmi': 36.6, 'gender': 'Male', 'ever_married': 'Yes', 'work_type': 'Private',
+    'Residence_type': 'Urban', 'smoking_status': 'formerly smoked'
+}
+
+def patient_for(run):
+    """A different (valid) patient per run, cycling through ages and glucose levels"""
+    patient = dict(BASE_PATIENT)
+    patient['age'] = 20 + run % 70
+    patient['avg_glucose_level'] = 60.0 + (run * 7) % 240
+    return patient
+
+def seed_session(at, page, patient):
+    """Session state each page expects after a completed assessment"""
+    at.session_state["patient_data"] = patient
+    if page == "02":
+        result = predict_stroke_risk(patient)
+        at.session_state["risk_result"] = {
+            'patient_id': "SOAK-001",
+            'risk_level': result['risk_level'],
+            'probability_percent': result['probability_percent'],
+            'probabilities': result['probabilities'],
+            'probability_raw': result['probability_raw'],
+            'input_data': patient
+        }
+
+def rss_mb():
+    gc.collect()
+    rss = _current_rss()
+    return rss / 1e6 if rss is not None else float('nan')
+
+def soak(page, runs, warmup, sample_every, timeout):
+    """Rerun one page `runs` times; returns (baseline_mb, samples, seconds)"""
+    at = AppTest.from_file(str(REPO_DIR / PAGES[page]), default_timeout=timeout)
+    baseline = None
+    samples = []
+    start = time.perf_counter()
+    for run in range(runs):
+        seed_session(at, page, patient_for(run))
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"Page {page} raised on run {run}: {at.exception[0].value}")
+        if run + 1 == warmup:
+            baseline = rss_mb()
+        if run >= warmup and (run - warmup) % sample_every == 0:
+            samples.append((run, rss_mb()))
+    samples.append((runs - 1, rss_mb()))
+    return baseline if baseline is not None else samples[0][1], samples, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=["02", "03"])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100, help="reruns before the RSS baseline is taken")
+    parser.add_argument("--sample-every", type=int, default=250)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per rerun")
+    parser.add_argument("--max-growth-mb", type=float, default=50.0,
+                        help="fail if RSS grows more than this after warmup")
+    parser.add_argument("--no-chart-cache", action="store_true", help="render every figure on every rerun")
+    args = parser.parse_args(argv)
+
+    if args.no_chart_cache:
+        chart_cache.max_bytes = 0
+
+    failed = False
+    for page in args.pages:
+        baseline, samples, seconds = soak(page, args.runs, args.warmup, args.sample_every, args.timeout)
+        growth = samples[-1][1] - baseline
+        figures = figure_stats.snapshot()
+        print(f"page {page}: {args.runs} reruns in {seconds:.1f}s, RSS {baseline:.1f} -> {samples[-1][1]:.1f} MB "
+            f"({growth:+.1f} MB), {figures['renders']:,} renders, {figures['bytes_rendered'] / 1e6:.1f} MB rendered")
+        print("   " + "  ".join(f"#{run}:{mb:.0f}MB" for run, mb in samples))
+
+        if growth > args.max_growth_mb:
+            print(f"page {page}: RSS grew {growth:.1f} MB > {args.max_growth_mb} MB", file=sys.stderr)
+            failed = True
+        if figures["open_figures"] or figures["pyplot_open_figures"]:
+            print(f"page {page}: {figures['open_figures']} managed / {figures['pyplot_open_figures']} pyplot "
+                "figures left open", file=sys.stderr)
+            failed = True
+
+    print(f"chart cache: {chart_cache.stats()}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
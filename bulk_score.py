@@ -0,0 +1,159 @@
+"""Streaming bulk scorer for stroke.csv-shaped files
+
+Reads a CSV or Parquet file with the raw patient fields (id, gender, age, ...,
+smoking_status) in fixed-size chunks, scores each chunk with one
+predict_stroke_risk_batch call and appends the results to a CSV. Memory is
+bounded by the chunk size, not the file size.
+
+After every chunk a checkpoint is written next to the output; rerunning with
+--resume continues from the last completed chunk after an interruption.
+
+Usage:
+    python bulk_score.py stroke.csv scored.csv
+    python bulk_score.py cohort.parquet scored.csv --chunk-size 100000 --impute-bmi
+    python bulk_score.py cohort.parquet scored.csv --resume
+    python bulk_score.py cohort.parquet scored.csv --workers 0     # all cores
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import pandas as pd
+
+from stroke_predictor_pkl import bmi_mean, predict_stroke_risk_batch
+
+RESULT_COLUMNS = ["status", "prediction", "risk_level", "probability_raw", "error"]
+
+def iter_chunks(input_path, chunk_size, skip_rows=0):
+    """Yield DataFrames of at most chunk_size rows, starting after skip_rows data rows"""
+    input_path = Path(input_path)
+    if input_path.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input needs pyarrow (pip install pyarrow)") from None
+
+        skipped = 0
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_size):
+            if skipped + batch.num_rows <= skip_rows:
+                skipped += batch.num_rows
+                continue
+            chunk = batch.to_pandas()
+            yield chunk.iloc[skip_rows - skipped:] if skipped < skip_rows else chunk
+            skipped = skip_rows
+    else:
+        # stroke.csv marks missing BMI as "N/A"
+        reader = pd.read_csv(input_path, chunksize=chunk_size, na_values=["N/A"],
+                            skiprows=range(1, skip_rows + 1) if skip_rows else None)
+        yield from reader
+
+def load_checkpoint(checkpoint_path, input_path, chunk_size):
+    """Read a checkpoint written by a previous run of the same job"""
+    with open(checkpoint_path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint["input"] != str(Path(input_path).resolve()) or checkpoint["chunk_size"] != chunk_size:
+        raise ValueError("Checkpoint was written for a different input file or chunk size")
+    return checkpoint
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Atomically replace the checkpoint file"""
+    tmp_path = Path(f"{checkpoint_path}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+def score_chunk(chunk, threshold=None, impute_bmi=False, batch_scorer=predict_stroke_risk_batch):
+    """Score one raw chunk; returns the id column (if any) joined to the batch results"""
+    if impute_bmi:
+        chunk = chunk.fillna({"bmi": bmi_mean})
+    results = batch_scorer(chunk, threshold=threshold)[RESULT_COLUMNS]
+    if "id" in chunk.columns:
+        results.insert(0, "id", chunk["id"].to_numpy())
+    return results
+
+def run(input_path, output_path, chunk_size=50000, threshold=None, impute_bmi=False,
+        resume=False, checkpoint_path=None, scorer=score_chunk, log=sys.stderr):
+    """Stream input_path through the scorer into output_path; returns (rows, seconds)"""
+    checkpoint_path = Path(checkpoint_path or f"{output_path}.checkpoint.json")
+    checkpoint = {"input": str(Path(input_path).resolve()), "output": str(Path(output_path).resolve()),
+                "chunk_size": chunk_size, "rows_done": 0, "chunks_done": 0, "output_bytes": 0}
+
+    if resume and checkpoint_path.exists():
+        saved = load_checkpoint(checkpoint_path, input_path, chunk_size)
+        output_size = Path(output_path).stat().st_size if Path(output_path).exists() else -1
+        if output_size < saved["output_bytes"]:
+            # The output was deleted or cut short since the checkpoint: the completed chunks are gone
+            print("Output is missing or shorter than the checkpoint records; starting from the first row",
+                file=log)
+        else:
+            checkpoint = saved
+            # Drop anything written after the last checkpoint (a chunk interrupted mid-write)
+            with open(output_path, "r+b") as f:
+                f.truncate(checkpoint["output_bytes"])
+            print(f"Resuming after {checkpoint['rows_done']:,} rows", file=log)
+    if checkpoint["rows_done"] == 0 and Path(output_path).exists():
+        Path(output_path).unlink()
+
+    start = time.perf_counter()
+    rows_this_run = 0
+    with open(output_path, "a", newline="", encoding="utf-8") as out:
+        for chunk in iter_chunks(input_path, chunk_size, skip_rows=checkpoint["rows_done"]):
+            chunk_start = time.perf_counter()
+            results = scorer(chunk, threshold=threshold, impute_bmi=impute_bmi)
+            results.to_csv(out, header=checkpoint["output_bytes"] == 0, index=False)
+            out.flush()
+            os.fsync(out.fileno())
+
+            checkpoint["rows_done"] += len(chunk)
+            checkpoint["chunks_done"] += 1
+            checkpoint["output_bytes"] = out.tell()
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            rows_this_run += len(chunk)
+            chunk_seconds = time.perf_counter() - chunk_start
+            print(f"chunk {checkpoint['chunks_done']:>5}: {len(chunk):>8,} rows in {chunk_seconds:6.2f}s "
+                f"({len(chunk) / max(chunk_seconds, 1e-9):>10,.0f} rows/s)", file=log)
+
+    elapsed = time.perf_counter() - start
+    checkpoint_path.unlink(missing_ok=True)
+    return rows_this_run, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a stroke.csv-shaped CSV/Parquet file through the model")
+    parser.add_argument("input", help="CSV or Parquet file with raw patient fields")
+    parser.add_argument("output", help="CSV file to write results to")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="High-risk probability cut (default: configured High-Risk Alert Threshold)")
+    parser.add_argument("--impute-bmi", action="store_true",
+                        help="Fill missing BMI with the training mean instead of reporting the row as an error")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted run")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint path (default: <output>.checkpoint.json)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Score each chunk across this many processes (0 = one per core)")
+    args = parser.parse_args(argv)
+
+    if args.workers == 1:
+        rows, elapsed = run(args.input, args.output, args.chunk_size, args.threshold, args.impute_bmi,
+                            args.resume, args.checkpoint)
+    else:
+        from parallel_scoring import ParallelScorer
+
+        with ParallelScorer(n_workers=args.workers or None) as pool:
+            def parallel_batch(chunk, threshold=None):
+                return pool.score(chunk, threshold=threshold)[0]
+
+            scorer = partial(score_chunk, batch_scorer=parallel_batch)
+            rows, elapsed = run(args.input, args.output, args.chunk_size, args.threshold, args.impute_bmi,
+                                args.resume, args.checkpoint, scorer=scorer)
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+CHART_CACHE_MB = float(os.environ.get("STROKERISK_CHART_CACHE_MB", 64))
+CHART_DPI = 150
+
+# --- Figure Lifecycle ---
+class FigureStats:
+    """Process-wide counters for figures created through managed_figure"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.closed = 0
+        self.renders = 0
+        self.bytes_rendered = 0
+
+    def record(self, opened=0, closed=0, rendered_bytes=None):
+        with self._lock:
+            self.opened += opened
+            self.closed += closed
+            if rendered_bytes is not None:
+                self.renders += 1
+                self.bytes_rendered += rendered_bytes
+
+    def snapshot(self):
+        with self._lock:
+            stats = {
+                "figures_opened": self.opened,
+                "figures_closed": self.closed,
+                "open_figures": self.opened - self.closed,
+                "renders": self.renders,
+                "bytes_rendered": self.bytes_rendered
+            }
+        # Figures made through pyplot elsewhere stay registered until closed: a leak indicator
+        pyplot = sys.modules.get("matplotlib.pyplot")
+        stats["pyplot_open_figures"] = len(pyplot.get_fignums()) if pyplot else 0
+        return stats
+
+figure_stats = FigureStats()
+
+@contextmanager
+def managed_figure(figsize=(8, 6), **subplot_kw):
+    """Yield (fig, ax) for a figure that is released on exit, even if drawing fails
+
+    The figure is built with the object-oriented API, so it is never registered
+    with pyplot's global figure manager and nothing outlives the block.
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    figure_stats.record(opened=1)
+    try:
+        yield fig, fig.subplots(**subplot_kw)
+    finally:
+        fig.clear()
+        figure_stats.record(closed=1)
+
+def render_png(fig, dpi=None):
+    """PNG bytes of a figure, counted in figure_stats"""
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    png = buf.getvalue()
+    figure_stats.record(rendered_bytes=len(png))
+    return png
+
+# --- PNG Cache ---
+def _feed(digest, value):
+    """Hash a chart input: arrays by their bytes, containers recursively, anything else by repr"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        _feed(digest, value.to_numpy())
+        _feed(digest, list(value.columns) if isinstance(value, pd.DataFrame) else value.name)
+        _feed(digest, list(value.index))
+    elif isinstance(value, np.ndarray):
+        digest.update(f"nd{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=repr):
+            _feed(digest, key)
+            _feed(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _feed(digest, item)
+        digest.update(b"]")
+    else:
+        digest.update(repr(value).encode())
+        digest.update(b"|")
+
+def chart_key(name, data):
+    """Stable cache key for a chart named `name` drawn from `data`"""
+    digest = hashlib.sha256(name.encode())
+    _feed(digest, data)
+    return digest.hexdigest()
+
+class ChartCache:
+    """Byte-bounded LRU of rendered chart PNGs, keyed by the chart's input data
+
+    A chart is drawn only on a miss, inside managed_figure, and rendered to PNG
+    before the figure is released. Identical charts (same name and inputs) are
+    served from the stored bytes.
+    """
+
+    def __init__(self, max_bytes=int(CHART_CACHE_MB * (1 << 20)), dpi=CHART_DPI):
+        self.max_bytes = max_bytes
+        self.dpi = dpi
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def png(self, name, data, draw, figsize=(8, 6)):
+        """PNG for chart `name` drawn from `data`; `draw(fig, ax)` runs only on a miss"""
+        key = chart_key(name, data)
+        with self._lock:
+            png = self._data.get(key)
+            if png is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        with managed_figure(figsize=figsize) as (fig, ax):
+            draw(fig, ax)
+            png = render_png(fig, dpi=self.dpi)
+        self.put(key, png)
+        return png
+
+    def put(self, key, png):
+        with self._lock:
+            if key in self._data:
+                return
+            if len(png) > self.max_bytes:
+                # Larger than the whole budget: serve it once, don't keep it
+                return
+            self._data[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+# Shared instance used by the analysis pages and plot_model_performance
+chart_cache = ChartCache()
@@ -0,0 +1,138 @@
+"""Typed columnar binary cache for the model datasets
+
+The first load of a dataset converts its CSV once into
+    .data_cache/<name>.X.npy      float32 feature matrix (rows x model columns)
+    .data_cache/<name>.y.npy      int8 stroke label
+    .data_cache/<name>.meta.json  column names plus the source file's size, mtime and SHA-256
+Later loads memory-map the .npy files read-only, so there is no text parsing
+and every worker process shares the same page-cached copy. The cache is
+rebuilt automatically when the source CSV changes.
+
+Run `python dataset_cache.py` to build every cache ahead of deployment.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+current_dir = Path(__file__).parent
+DATA_CACHE_DIR = current_dir / ".data_cache"
+CACHE_FORMAT_VERSION = 1
+
+# name -> (source CSV, whether it still needs encoding by the feature pipeline)
+DATASETS = {
+    "validation": ("stroke_data_smoted_scaled_for_pycaret.csv", False),
+    "training": ("stroke.csv", True)
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+def _paths(name, cache_dir=DATA_CACHE_DIR):
+    return (cache_dir / f"{name}.X.npy", cache_dir / f"{name}.y.npy", cache_dir / f"{name}.meta.json")
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_source(source_path, needs_encoding):
+    """Parse the CSV once into (float32 X, int8 y, column names)"""
+    if needs_encoding:
+        from feature_pipeline import feature_pipeline
+
+        # Raw stroke.csv: categorical fields go through the same pipeline as the app
+        df = pd.read_csv(source_path, na_values=["N/A"])
+        return (feature_pipeline.transform(df), df["stroke"].to_numpy(dtype=np.int8),
+                list(feature_pipeline.columns))
+
+    df = pd.read_csv(source_path, dtype=np.float32)
+    X = df.drop(columns=["stroke"])
+    return X.to_numpy(dtype=np.float32), df["stroke"].to_numpy(dtype=np.int8), list(X.columns)
+
+def _is_fresh(meta, source_path):
+    if meta.get("format_version") != CACHE_FORMAT_VERSION:
+        return False
+    if not source_path.exists():
+        # Deployed without the CSV: the cache is the only copy, so trust it
+        return True
+    stat = source_path.stat()
+    return meta["source_size"] == stat.st_size and meta["source_mtime_ns"] == stat.st_mtime_ns
+
+def build(name, cache_dir=DATA_CACHE_DIR):
+    """(Re)convert one dataset's CSV into the binary cache; returns its metadata"""
+    source_name, needs_encoding = DATASETS[name]
+    source_path = current_dir / source_name
+    X_path, y_path, meta_path = _paths(name, cache_dir)
+
+    X, y, columns = _read_source(source_path, needs_encoding)
+    stat = source_path.stat()
+    meta = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "source": source_name,
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_sha256": _sha256(source_path),
+        "rows": int(X.shape[0]),
+        "columns": columns
+    }
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    suffix = f".{os.getpid()}.tmp"
+    # Arrays first, metadata last: a meta file only ever points at complete arrays
+    for path, array in ((X_path, np.ascontiguousarray(X, dtype=np.float32)), (y_path, y)):
+        tmp_path = path.with_name(path.name + suffix)
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    tmp_meta = meta_path.with_name(meta_path.name + suffix)
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+    return meta
+
+def load_dataset(name, cache_dir=DATA_CACHE_DIR):
+    """Return (X, y, columns, dataset_hash) with X/y memory-mapped read-only
+
+    Builds or refreshes the cache first if needed. dataset_hash is the SHA-256
+    of the source CSV, recorded at conversion time.
+    """
+    source_path = current_dir / DATASETS[name][0]
+    X_path, y_path, meta_path = _paths(name, cache_dir)
+
+    with _lock:
+        cached = _loaded.get((name, cache_dir))
+        if cached is not None and _is_fresh(cached[0], source_path):
+            return cached[1]
+
+        meta = None
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta is None or not _is_fresh(meta, source_path):
+            meta = build(name, cache_dir)
+
+        dataset = (np.load(X_path, mmap_mode="r"), np.load(y_path, mmap_mode="r"),
+                meta["columns"], meta["source_sha256"])
+        _loaded[(name, cache_dir)] = (meta, dataset)
+        return dataset
+
+def load_frame(name):
+    """Convenience wrapper: (X DataFrame over the memory map, y Series, dataset_hash)"""
+    X, y, columns, dataset_hash = load_dataset(name)
+    # A single float32 block wraps the mmap without copying
+    return (pd.DataFrame(X, columns=columns, copy=False), pd.Series(y, name="stroke", copy=False),
+            dataset_hash)
+
+if __name__ == "__main__":
+    for dataset_name in (sys.argv[1:] or DATASETS):
+        info = build(dataset_name)
+        print(f"{dataset_name}: {info['rows']:,} rows x {len(info['columns'])} columns from {info['source']}")
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from threshold_engine import ThresholdSweep
+
+# Configuration
+current_dir = Path(__file__).parent
+EVAL_CACHE_DIR = current_dir / ".eval_cache"
+
+# Bump when the stored layout or metric definitions change so old entries are ignored
+EVAL_SCHEMA_VERSION = 2
+
+_file_hashes = {}
+
+def file_hash(path):
+    """SHA-256 of a file's contents, memoized on (path, mtime, size)"""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+# Decision thresholds reported in the stored threshold sweep
+SWEEP_THRESHOLDS = np.round(np.arange(0.05, 1.0, 0.05), 2)
+
+def score_model(model, X):
+    """The one inference pass per model: P(stroke) for every row as float64"""
+    return np.asarray(model.predict_proba(X)[:, 1], dtype=np.float64)
+
+def _counts(y, y_pred):
+    """(tn, fp, fn, tp) for binary labels"""
+    tp = int(np.sum(y_pred & y))
+    fp = int(np.sum(y_pred & ~y))
+    fn = int(np.sum(~y_pred & y))
+    return int(len(y)) - tp - fp - fn, fp, fn, tp
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else 0.0
+
+def evaluate_scores(y, scores, threshold=0.5):
+    """Every metric, curve and sweep the performance page shows, derived from one score vector"""
+    from sklearn.metrics import roc_auc_score, roc_curve, precision_recall_curve, average_precision_score
+
+    y = np.asarray(y).astype(bool)
+    # Strict '>' matches predict() for binary classifiers (argmax picks class 0 on a 0.5 tie)
+    y_pred = scores > threshold
+    tn, fp, fn, tp = _counts(y, y_pred)
+
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    f1 = _ratio(2 * precision * recall, precision + recall)
+    npv = _ratio(tn, tn + fn)
+    specificity = _ratio(tn, tn + fp)
+    f1_negative = _ratio(2 * npv * specificity, npv + specificity)
+    support = {'0': tn + fp, '1': tp + fn}
+
+    fpr, tpr, _ = roc_curve(y, scores)
+    pr_precision, pr_recall, _ = precision_recall_curve(y, scores)
+    return {
+        'accuracy': _ratio(tp + tn, len(y)),
+        'roc_auc': roc_auc_score(y, scores),
+        'f1_score': f1,
+        'precision': precision,
+        'recall': recall,
+        'specificity': specificity,
+        'average_precision': average_precision_score(y, scores),
+        'confusion_matrix': np.array([[tn, fp], [fn, tp]]),
+        # Same layout as sklearn's classification_report(output_dict=True)
+        'classification_report': {
+            '0': {'precision': npv, 'recall': specificity, 'f1-score': f1_negative, 'support': support['0']},
+            '1': {'precision': precision, 'recall': recall, 'f1-score': f1, 'support': support['1']},
+            'accuracy': _ratio(tp + tn, len(y)),
+            'macro avg': {'precision': (npv + precision) / 2, 'recall': (specificity + recall) / 2,
+                        'f1-score': (f1_negative + f1) / 2, 'support': len(y)},
+            'weighted avg': {
+                'precision': _ratio(npv * support['0'] + precision * support['1'], len(y)),
+                'recall': _ratio(specificity * support['0'] + recall * support['1'], len(y)),
+                'f1-score': _ratio(f1_negative * support['0'] + f1 * support['1'], len(y)),
+                'support': len(y)
+            }
+        },
+        'roc_curve': {'fpr': fpr, 'tpr': tpr},
+        'pr_curve': {'precision': pr_precision, 'recall': pr_recall},
+        'threshold_sweep': ThresholdSweep(y, scores).at_many(SWEEP_THRESHOLDS)
+    }
+
+def compute_evaluation(model, X, y):
+    """Score a model once and derive all metrics from that probability vector"""
+    scores = score_model(model, X)
+    evaluation = evaluate_scores(y, scores)
+    evaluation['scores'] = scores.astype(np.float32)
+    return evaluation
+
+def _to_jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    return value
+
+def _from_json(evaluation):
+    evaluation['confusion_matrix'] = np.asarray(evaluation['confusion_matrix'])
+    for key in ('roc_curve', 'pr_curve', 'threshold_sweep'):
+        if evaluation.get(key):
+            evaluation[key] = {k: np.asarray(v) for k, v in evaluation[key].items()}
+    return evaluation
+
+class EvaluationStore:
+    """Disk-backed evaluation results keyed by (model hash, dataset hash)
+
+    Each model is scored once per artifact/dataset pair; afterwards results are
+    served from memory or from a JSON file under EVAL_CACHE_DIR, shared across
+    workers and restarts.
+    """
+
+    def __init__(self, cache_dir=EVAL_CACHE_DIR, compute_fn=compute_evaluation):
+        self.cache_dir = Path(cache_dir)
+        self.compute_fn = compute_fn
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _path(self, model_hash, dataset_hash):
+        return self.cache_dir / f"v{EVAL_SCHEMA_VERSION}_{model_hash[:16]}_{dataset_hash[:16]}.json"
+
+    def get(self, model_hash, dataset_hash):
+        """Stored evaluation, or None if this pair has not been evaluated"""
+        path = self._path(model_hash, dataset_hash)
+        evaluation = self._memory.get(path)
+        scores_path = path.with_suffix(".scores.npy")
+        if evaluation is None and path.exists() and scores_path.exists():
+            with open(path, encoding="utf-8") as f:
+                evaluation = _from_json(json.load(f))
+            # The cached probability vector lets later analyses skip inference entirely
+            evaluation['scores'] = np.load(scores_path, mmap_mode='r')
+            self._memory[path] = evaluation
+        return evaluation
+
+    def get_or_compute(self, model, model_hash, X, y, dataset_hash):
+        """Return the stored evaluation, computing and persisting it on first request"""
+        evaluation = self.get(model_hash, dataset_hash)
+        if evaluation is not None:
+            return evaluation
+
+        with self._lock:
+            evaluation = self.get(model_hash, dataset_hash)
+            if evaluation is None:
+                evaluation = self.compute_fn(model, X, y)
+                self._save(self._path(model_hash, dataset_hash), evaluation)
+        return evaluation
+
+    def _save(self, path, evaluation):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Scores first: get() treats the JSON file as the commit marker
+        scores_tmp = path.with_suffix(f".{os.getpid()}.tmp.npy")
+        np.save(scores_tmp, evaluation['scores'])
+        scores_tmp.replace(path.with_suffix(".scores.npy"))
+
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_to_jsonable({k: v for k, v in evaluation.items() if k != 'scores'}), f)
+        tmp_path.replace(path)
+        self._memory[path] = evaluation
+
+# Shared instance used by the Model Performance page
+evaluation_store = EvaluationStore()
@@ -0,0 +1,144 @@
+"""Export a pickled XGBoost pipeline to XGBoost's native format
+
+Writes <model>.ubj (or .json) plus <model>.manifest.json next to the pickle and
+checks that the native booster reproduces the pickle's probabilities, including
+on rows with missing values. The pipeline's fitted imputers are recorded in the
+manifest and replayed by the native model; pycaret steps that leave the data
+unchanged are skipped, and any other preprocessing step stops the export.
+model_registry loads the export in place of the same model's pickle, which
+skips unpickling the pycaret pipeline (and its version-mismatch warnings) on
+every worker boot.
+
+Only XGBoost pipelines can be exported. The clinical predictor scores with the
+Ensemble unless STROKERISK_PREDICTOR_MODEL=XGBoost is set, so by default its
+cold start still unpickles the ensemble; the export speeds up the pages and
+jobs that load the XGBoost model.
+
+Usage:
+    python export_native_model.py                       # strokerisk_model_xgboost.pkl
+    python export_native_model.py path/to/model.pkl --format json
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model_registry import (MODEL_FILES, manifest_path_for, _unwrap_model, find_xgboost_estimator,
+                            imputer_fill_values, NativeXGBoostModel)
+from feature_pipeline import MODEL_COLUMNS, PIPELINE_PATH, feature_pipeline
+
+current_dir = Path(__file__).parent
+
+def build_manifest(model_path, native_path, estimator, booster, pipeline_steps, fill_values):
+    """Small JSON description of how to feed the native booster"""
+    import xgboost as xgb
+
+    feature_names = booster.feature_names or MODEL_COLUMNS
+    unknown = [name for name in fill_values if name not in feature_names]
+    if unknown:
+        raise ValueError(f"Imputer columns not among the booster's features: {', '.join(unknown)}")
+    best_iteration = getattr(estimator, "best_iteration", None)
+    config = json.loads(booster.save_config())
+    return {
+        "format": native_path.suffix.lstrip("."),
+        "model_file": native_path.name,
+        "source_pickle": Path(model_path).name,
+        "objective": config["learner"]["objective"]["name"],
+        "feature_names": list(feature_names),
+        "iteration_range": [0, best_iteration + 1] if best_iteration is not None else [0, 0],
+        "pipeline_steps": pipeline_steps,
+        "fill_values": fill_values,
+        "feature_pipeline": {
+            "file": PIPELINE_PATH.name,
+            "fingerprint": feature_pipeline.fingerprint,
+            "config": feature_pipeline.to_dict()
+        },
+        "xgboost_version": xgb.__version__,
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds")
+    }
+
+def with_missing_values(X, n_rows=200, seed=0):
+    """X plus up to n_rows copies of its rows with one feature blanked each, cycling through the features"""
+    rng = np.random.default_rng(seed)
+    blanked = X.iloc[rng.choice(len(X), size=min(n_rows, len(X)), replace=False)].reset_index(drop=True)
+    blanked = blanked.astype({column: float for column in blanked.columns})
+    for i in range(len(blanked)):
+        blanked.iat[i, i % blanked.shape[1]] = np.nan
+    return pd.concat([X.astype(float), blanked], ignore_index=True)
+
+def check_parity(pipeline, native_model, data_path, tolerance):
+    """Max |p_pickle - p_native| over the check dataset and its missing-value rows; raises if above tolerance"""
+    X = pd.read_csv(data_path)
+    X = X.drop(columns=[c for c in ("stroke",) if c in X.columns])
+    # Missing values are where a skipped imputer would show: XGBoost routes NaN down default branches
+    X = with_missing_values(X)
+    expected = pipeline.predict_proba(X)[:, 1]
+    actual = native_model.predict_proba(X)[:, 1]
+    max_diff = float(np.max(np.abs(expected - actual)))
+    if max_diff > tolerance:
+        raise ValueError(f"Native model disagrees with the pickle (max |diff| = {max_diff:.2e}); "
+                        "the pipeline probably has preprocessing steps the booster does not replay")
+    return max_diff
+
+def export(model_path, fmt="ubj", check_data=None, tolerance=1e-5):
+    """Export one pickle; returns the manifest that was written"""
+    model_path = Path(model_path)
+    native_path = model_path.with_suffix(f".{fmt}")
+    manifest_path = manifest_path_for(model_path)
+
+    pipeline, _ = _unwrap_model(joblib.load(model_path))
+    estimator, pipeline_steps = find_xgboost_estimator(pipeline)
+    booster = estimator.get_booster()
+    # Refuses pipelines whose preprocessing the native model could not replay
+    fill_values = imputer_fill_values(pipeline, booster.feature_names or MODEL_COLUMNS)
+    booster.save_model(str(native_path))
+
+    # The encoding travels with the model: keep feature_pipeline.json next to the artifacts
+    if not PIPELINE_PATH.exists():
+        feature_pipeline.save()
+    manifest = build_manifest(model_path, native_path, estimator, booster, pipeline_steps, fill_values)
+    write_manifest(manifest_path, manifest)
+    if check_data is not None:
+        try:
+            native_model = NativeXGBoostModel.load(manifest_path)
+            manifest["parity_max_abs_diff"] = check_parity(pipeline, native_model, check_data, tolerance)
+        except Exception:
+            # Never leave a manifest behind that the registry would prefer over a good pickle
+            manifest_path.unlink()
+            raise
+        write_manifest(manifest_path, manifest)
+    return manifest
+
+def write_manifest(manifest_path, manifest):
+    """Write the manifest as indented JSON"""
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model", nargs="?", default=current_dir / MODEL_FILES["XGBoost"],
+                        help="Pickled XGBoost model or pycaret pipeline")
+    parser.add_argument("--format", choices=["ubj", "json"], default="ubj",
+                        help="Native serialisation format (default: ubj)")
+    parser.add_argument("--check-data", default=current_dir / "stroke_data_smoted_scaled_for_pycaret.csv",
+                        help="CSV of encoded features used to verify the export matches the pickle")
+    parser.add_argument("--skip-check", action="store_true",
+                        help="Export without comparing native and pickled predictions")
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args(argv)
+
+    check_data = None if args.skip_check else args.check_data
+    manifest = export(args.model, args.format, check_data, args.tolerance)
+    print(f"Exported {manifest['source_pickle']} -> {manifest['model_file']} "
+        f"({len(manifest['feature_names'])} features, xgboost {manifest['xgboost_version']})")
+    if "parity_max_abs_diff" in manifest:
+        print(f"Parity check: max |diff| = {manifest['parity_max_abs_diff']:.2e}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
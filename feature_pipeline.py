@@ -0,0 +1,240 @@
+import hashlib
+import json
+from bisect import bisect_left
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Configuration
+current_dir = Path(__file__).parent
+PIPELINE_PATH = current_dir / "feature_pipeline.json"
+PIPELINE_VERSION = 1
+
+# Exact column order the models were trained on
+MODEL_COLUMNS = [
+    'age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi',
+    'gender_Male', 'gender_Other', 'ever_married_Yes',
+    'work_type_Never_worked', 'work_type_Private',
+    'work_type_Self-employed', 'work_type_children',
+    'Residence_type_Urban', 'smoking_status_formerly smoked',
+    'smoking_status_never smoked', 'smoking_status_smokes',
+    'age_group_19-30', 'age_group_31-45', 'age_group_46-60',
+    'age_group_61-75', 'age_group_76+'
+]
+
+# Encoding used for the shipped models; feature_pipeline.json, when present, overrides it
+DEFAULT_CONFIG = {
+    "version": PIPELINE_VERSION,
+    "columns": MODEL_COLUMNS,
+    # Training data stats: field -> [mean, std]
+    "scaling": {
+        "age": [43.23, 22.61],
+        "avg_glucose_level": [106.15, 45.28],
+        "bmi": [28.89, 7.85]
+    },
+    "binary_fields": ["hypertension", "heart_disease"],
+    # Categorical field -> value assumed when the field is missing
+    "categorical_defaults": {
+        "gender": "Female",
+        "ever_married": "No",
+        "work_type": "Private",
+        "Residence_type": "Urban",
+        "smoking_status": "never smoked"
+    },
+    # Age groups: <=30, <=45, <=60, <=75, else 76+ (ages below 19 fall in the first group)
+    "age_group_edges": [30, 45, 60, 75],
+    "age_group_columns": ["age_group_19-30", "age_group_31-45", "age_group_46-60",
+                        "age_group_61-75", "age_group_76+"]
+}
+
+def as_input_frame(records, fields):
+    """Normalize a list of dicts, DataFrame or NumPy structured array into a raw input frame"""
+    if isinstance(records, pd.DataFrame):
+        frame = records
+    elif isinstance(records, np.ndarray):
+        if records.dtype.names is None:
+            raise TypeError("NumPy input must be a structured array with named fields")
+        frame = pd.DataFrame.from_records(records)
+        # Byte-string fields ('S' dtype) are decoded so category matching works
+        for name in records.dtype.names:
+            if records.dtype[name].kind == 'S':
+                frame[name] = frame[name].str.decode('utf-8')
+    else:
+        frame = pd.DataFrame.from_records(list(records))
+
+    # Missing columns become NaN so validation can report them per row
+    missing = [field for field in fields if field not in frame.columns]
+    if missing:
+        frame = frame.assign(**{field: np.nan for field in missing})
+    return frame
+
+class FeaturePipeline:
+    """Versioned raw-patient -> model-matrix encoding shared by every caller
+
+    Category-to-column lookup tables are derived once from the column order, so
+    encoding writes straight into a float32 matrix with no intermediate dict or
+    DataFrame. The predictor, the multi-model analysis page, bulk scoring and
+    the dataset cache all go through one instance, and its config is saved next
+    to the model artifacts so an encoding change travels with the models.
+    """
+
+    def __init__(self, config=DEFAULT_CONFIG):
+        self.config = json.loads(json.dumps(config))
+        self.version = self.config["version"]
+        self.columns = list(self.config["columns"])
+        self.n_features = len(self.columns)
+        self.scaling = {field: tuple(stats) for field, stats in self.config["scaling"].items()}
+        self.binary_fields = list(self.config["binary_fields"])
+        self.categorical_defaults = dict(self.config["categorical_defaults"])
+        self.age_group_edges = list(self.config["age_group_edges"])
+        self.input_fields = list(self.scaling) + self.binary_fields + list(self.categorical_defaults)
+
+        index = {name: i for i, name in enumerate(self.columns)}
+        self._numeric = [(field, index[field], mean, std) for field, (mean, std) in self.scaling.items()]
+        self._binary = [(field, index[field]) for field in self.binary_fields]
+        # e.g. 'gender' -> {'Male': 5, 'Other': 6}; the dropped baseline category has no column
+        self._categorical = []
+        for field, default in self.categorical_defaults.items():
+            prefix = f"{field}_"
+            table = {name[len(prefix):]: i for name, i in index.items() if name.startswith(prefix)}
+            self._categorical.append((field, default, table))
+        self._age_groups = np.array([index[name] for name in self.config["age_group_columns"]], dtype=np.intp)
+
+        # Encoded column -> raw input field it came from (the age groups belong to 'age')
+        self.column_sources = {name: name for name in list(self.scaling) + self.binary_fields}
+        for field, _, table in self._categorical:
+            self.column_sources.update({self.columns[i]: field for i in table.values()})
+        self.column_sources.update({name: 'age' for name in self.config["age_group_columns"]})
+        # Raw input field -> indices of every column it writes
+        self.field_columns = {field: np.array([index[name] for name, source in self.column_sources.items()
+                                            if source == field], dtype=np.intp)
+                            for field in self.input_fields}
+        self._numeric_by_field = {field: (col, mean, std) for field, col, mean, std in self._numeric}
+        self._binary_by_field = dict(self._binary)
+        self._categorical_by_field = {field: table for field, _, table in self._categorical}
+
+    @property
+    def fingerprint(self):
+        """Short hash of the full config, for cache keys and artifact manifests"""
+        payload = json.dumps(self.config, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()[:16]
+
+    def to_dict(self):
+        return json.loads(json.dumps(self.config))
+
+    def save(self, path=PIPELINE_PATH):
+        """Write the config as JSON next to the model artifacts"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.config, f, indent=2)
+
+    @classmethod
+    def load(cls, path=PIPELINE_PATH):
+        """Load a saved pipeline, falling back to DEFAULT_CONFIG when none has been saved"""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        if config.get("version") != PIPELINE_VERSION:
+            raise ValueError(f"Unsupported feature pipeline version {config.get('version')} in {path}")
+        return cls(config)
+
+    def allocate(self, n_rows):
+        """Return a zeroed float32 matrix sized for n_rows patients"""
+        return np.zeros((n_rows, self.n_features), dtype=np.float32)
+
+    def transform_one(self, input_data, out=None):
+        """Encode a single patient dict into a 1-D float32 row"""
+        if out is None:
+            out = np.zeros(self.n_features, dtype=np.float32)
+        else:
+            out[:] = 0
+
+        for field, col, mean, std in self._numeric:
+            if field in input_data:
+                out[col] = (input_data[field] - mean) / std
+        for field, col in self._binary:
+            out[col] = 1 if input_data.get(field, 0) == 1 else 0
+        for field, default, table in self._categorical:
+            col = table.get(input_data.get(field, default))
+            if col is not None:
+                out[col] = 1
+
+        group = bisect_left(self.age_group_edges, input_data.get('age', 0))
+        out[self._age_groups[group]] = 1
+        return out
+
+    def patch(self, out, field, value):
+        """Re-encode one raw field in place, leaving every other column untouched
+
+        `out` is an encoded row or matrix; `value` is a scalar, or one value per
+        row of a matrix. Changing age rewrites the scaled age and its age-group bits.
+        """
+        if field in self._numeric_by_field:
+            col, mean, std = self._numeric_by_field[field]
+            out[..., col] = (np.asarray(value, dtype=np.float64) - mean) / std
+            if field == 'age':
+                groups = self._age_groups[np.searchsorted(self.age_group_edges, value, side='left')]
+                out[..., self._age_groups] = 0
+                if out.ndim == 1:
+                    out[groups] = 1
+                else:
+                    out[np.arange(len(out)), groups] = 1
+        elif field in self._binary_by_field:
+            out[..., self._binary_by_field[field]] = np.asarray(value) == 1
+        elif field in self._categorical_by_field:
+            table = self._categorical_by_field[field]
+            out[..., self.field_columns[field]] = 0
+            col = table.get(value)
+            if col is not None:
+                out[..., col] = 1
+        else:
+            raise KeyError(f"Unknown input field '{field}'")
+        return out
+
+    def transform(self, records, out=None):
+        """Encode many patients (list of dicts, DataFrame or structured array) into an (n, 21) matrix
+
+        Pass a preallocated `out` (see allocate) to reuse one buffer across chunks.
+        """
+        frame = as_input_frame(records, self.input_fields)
+        n_rows = len(frame)
+        if out is None:
+            out = self.allocate(n_rows)
+        else:
+            out = out[:n_rows]
+            out[:] = 0
+        rows = np.arange(n_rows)
+
+        for field, col, mean, std in self._numeric:
+            values = pd.to_numeric(frame[field], errors='coerce').to_numpy(dtype=np.float64)
+            out[:, col] = (values - mean) / std
+        for field, col in self._binary:
+            out[:, col] = frame[field].to_numpy() == 1
+        for field, default, table in self._categorical:
+            codes = frame[field].fillna(default).map(table).fillna(-1).to_numpy(dtype=np.intp)
+            hit = codes >= 0
+            out[rows[hit], codes[hit]] = 1
+
+        ages = pd.to_numeric(frame['age'], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        groups = np.searchsorted(self.age_group_edges, ages, side='left')
+        out[rows, self._age_groups[groups]] = 1
+        return out
+
+    def to_frame(self, matrix, index=None):
+        """Wrap an encoded matrix in a DataFrame with the model's column names (no copy)"""
+        return pd.DataFrame(np.atleast_2d(matrix), columns=self.columns, index=index, copy=False)
+
+    def transform_frame(self, records):
+        """transform() wrapped as a model-ready DataFrame, keeping the input's row index"""
+        frame = as_input_frame(records, self.input_fields)
+        return self.to_frame(self.transform(frame), index=frame.index)
+
+# Shared instance used by the predictor, the analysis pages and the batch tools
+feature_pipeline = FeaturePipeline.load()
+
+if __name__ == "__main__":
+    # Re-serialize the pipeline next to the model artifacts
+    feature_pipeline.save()
+    print(f"Saved feature pipeline v{feature_pipeline.version} ({feature_pipeline.fingerprint}) to {PIPELINE_PATH}")
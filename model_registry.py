@@ -0,0 +1,470 @@
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+# Configuration
+current_dir = Path(__file__).parent
+
+# Minimum seconds between on-disk change checks of a loaded model (reload_if_changed)
+STALE_CHECK_SECONDS = float(os.environ.get("STROKERISK_MODEL_CHECK_SECONDS", 1.0))
+
+# Display name -> artifact file, shared by the predictor and every page
+MODEL_FILES = {
+    "Ensemble": "strokerisk_tune_ensemble_model.pkl",
+    "Random Forest": "strokerisk_model_rf.pkl",
+    "XGBoost": "strokerisk_model_xgboost.pkl",
+    "Extra Trees": "strokerisk_model_et.pkl"
+}
+
+def _current_rss():
+    """Resident set size of this process in bytes, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _unwrap_model(model_data):
+    """Handle the different model saving formats; returns (model, feature_columns)"""
+    if isinstance(model_data, dict):
+        # Case 1: Model saved as dictionary with keys
+        model = model_data.get("model")
+        feature_columns = model_data.get("feature_columns", [])
+
+        # Fallback if 'model' key doesn't exist
+        if model is None:
+            for value in model_data.values():
+                if hasattr(value, 'predict'):
+                    model = value
+                    break
+    else:
+        # Case 2: Model saved directly
+        model = model_data
+        feature_columns = []
+
+    if not hasattr(model, 'predict'):
+        raise ValueError("Loaded object is not a valid scikit-learn model")
+    return model, list(feature_columns)
+
+def _artifact_files(path):
+    """Files whose contents define a model: the pickle, or the native manifest plus booster"""
+    manifest_path = manifest_path_for(path)
+    if manifest_path.exists():
+        import json
+
+        with open(manifest_path, encoding="utf-8") as f:
+            return [manifest_path, manifest_path.parent / json.load(f)["model_file"]]
+    return [Path(path)]
+
+def _watched_files(path, files):
+    """Files to stat for changes: the artifact files plus the manifest path, so a new export is noticed"""
+    manifest_path = manifest_path_for(path)
+    return list(files) if manifest_path in files else list(files) + [manifest_path]
+
+def _stat_signature(files):
+    """Cheap change detector: (mtime_ns, size) of each artifact file"""
+    signature = []
+    for file in files:
+        try:
+            stat = file.stat()
+            signature.append((str(file), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((str(file), None, None))
+    return tuple(signature)
+
+def _hash_files(files, chunk_size=1 << 20):
+    """SHA-256 over the artifact files' contents"""
+    digest = hashlib.sha256()
+    for file in files:
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_path_for(pickle_path):
+    """Manifest of the native XGBoost export written alongside a pickle (see export_native_model.py)"""
+    return Path(pickle_path).with_suffix(".manifest.json")
+
+def find_xgboost_estimator(model):
+    """Return (estimator, preceding pipeline step names) for a bare or pycaret-wrapped XGBClassifier"""
+    steps = []
+    estimator = model
+    if hasattr(model, "steps"):
+        steps = [name for name, _ in model.steps[:-1]]
+        estimator = model.steps[-1][1]
+    if not hasattr(estimator, "get_booster"):
+        raise ValueError(f"Final estimator {estimator.__class__.__name__} is not an XGBoost model")
+    return estimator, steps
+
+def imputer_fill_values(model, feature_names):
+    """{feature: fill value} from the fitted imputers in front of a pipeline's estimator
+
+    These are the only preprocessing steps a native booster can replay; pycaret
+    steps that never touch a column (an imputer with no columns, column-name
+    cleaning that leaves the booster's names unchanged) are skipped. Any other
+    step (or a non-numeric fill) raises ValueError, because the booster alone
+    would then score different inputs than the pipeline.
+    """
+    import re
+
+    fill_values = {}
+    for name, step in getattr(model, "steps", [])[:-1]:
+        # pycaret wraps each sklearn transformer and fits it on a column subset
+        transformer = getattr(step, "transformer", step)
+        include = getattr(step, "_include", None)
+        statistics = getattr(transformer, "statistics_", None)
+        if statistics is None and include is not None and len(include) == 0 \
+                and not hasattr(transformer, "n_features_in_"):
+            # e.g. categorical_imputer on an all-numeric dataset: pycaret keeps the step but never fits it
+            continue
+        if transformer.__class__.__name__ == "CleanColumnNames":
+            cleaned = [re.sub(transformer.match, "", str(column)) for column in include or feature_names]
+            if cleaned != list(feature_names):
+                raise ValueError(f"Pipeline step '{name}' renames columns to {cleaned}, "
+                                "not the booster's feature names")
+            continue
+        if statistics is None:
+            raise ValueError(f"Pipeline step '{name}' ({transformer.__class__.__name__}) "
+                            "cannot be replayed by the native booster")
+        missing = getattr(transformer, "missing_values", float("nan"))
+        if not (isinstance(missing, float) and missing != missing):
+            raise ValueError(f"Pipeline step '{name}' imputes {missing!r} rather than NaN")
+        columns = getattr(transformer, "feature_names_in_", None)
+        if columns is None:
+            columns = include or getattr(step, "include", None) or feature_names
+        if len(columns) != len(statistics):
+            raise ValueError(f"Pipeline step '{name}' has {len(statistics)} fill values for {len(columns)} columns")
+        for column, value in zip(columns, statistics):
+            try:
+                fill_values[str(column)] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Pipeline step '{name}' fills '{column}' with non-numeric {value!r}")
+    return fill_values
+
+def predict_contributions(model, X):
+    """Per-row tree-path SHAP values from an XGBoost model, in log-odds
+
+    Returns an (n_rows, n_features + 1) float32 array whose last column is the
+    bias; each row sums to the model's raw margin. Computed by the booster in
+    one native call, so a batch costs about the same as a prediction.
+    """
+    if hasattr(model, "predict_contributions"):
+        return model.predict_contributions(X)
+
+    import numpy as np
+    import xgboost as xgb
+
+    estimator, steps = find_xgboost_estimator(model)
+    if steps:
+        # Run the pycaret preprocessing steps the estimator was fitted behind
+        for _, step in model.steps[:-1]:
+            X = step.transform(X)
+    booster = estimator.get_booster()
+    best_iteration = getattr(estimator, "best_iteration", None)
+    iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+    matrix = xgb.DMatrix(np.ascontiguousarray(X, dtype=np.float32), feature_names=booster.feature_names)
+    return booster.predict(matrix, pred_contribs=True, iteration_range=iteration_range).astype(np.float32)
+
+class NativeXGBoostModel:
+    """scikit-learn style wrapper around a booster loaded from XGBoost's native format
+
+    Exposes predict_proba, predict and feature_importances_ so callers cannot tell
+    it apart from the unpickled pipeline, without going through pickle at all.
+    Missing values are filled with the pipeline's fitted imputer statistics
+    (manifest "fill_values") before the booster sees them, as the pipeline does.
+    An export whose feature-pipeline fingerprint differs from the live
+    feature_pipeline.json is refused rather than fed differently encoded rows.
+    """
+
+    def __init__(self, booster, manifest):
+        import numpy as np
+
+        if manifest.get("objective") != "binary:logistic":
+            raise ValueError(f"Unsupported objective in manifest: {manifest.get('objective')}")
+        if manifest.get("pipeline_steps") and "fill_values" not in manifest:
+            raise ValueError("Manifest predates imputer replay but the pipeline has preprocessing steps; "
+                            "re-run export_native_model.py")
+        exported_pipeline = manifest.get("feature_pipeline", {}).get("fingerprint")
+        if exported_pipeline is not None:
+            from feature_pipeline import feature_pipeline
+
+            # The booster only understands rows encoded the way they were at export
+            if exported_pipeline != feature_pipeline.fingerprint:
+                raise ValueError(f"Model was exported with feature pipeline {exported_pipeline} but "
+                                f"feature_pipeline.json is now {feature_pipeline.fingerprint}; restore the "
+                                "exported encoding (manifest \"feature_pipeline\") or retrain and re-export")
+        self.booster = booster
+        self.manifest = manifest
+        self.feature_names = list(manifest["feature_names"])
+        self.iteration_range = tuple(manifest.get("iteration_range", (0, 0)))
+        self.classes_ = [0, 1]
+        self._feature_importances = None
+        fill_values = manifest.get("fill_values", {})
+        self._fill_index = np.array([self.feature_names.index(name) for name in fill_values], dtype=np.intp)
+        self._fill_values = np.array(list(fill_values.values()), dtype=np.float32)
+
+    @classmethod
+    def load(cls, manifest_path):
+        """Load the booster file named in a JSON manifest"""
+        import json
+        import xgboost as xgb
+
+        manifest_path = Path(manifest_path)
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        booster = xgb.Booster()
+        booster.load_model(str(manifest_path.parent / manifest["model_file"]))
+        return cls(booster, manifest)
+
+    def get_booster(self):
+        return self.booster
+
+    def _as_matrix(self, X):
+        """Float32 matrix with columns in the booster's training order"""
+        import numpy as np
+
+        if hasattr(X, "columns"):
+            X = X[self.feature_names]
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(self._fill_index):
+            columns = X[:, self._fill_index]
+            missing = np.isnan(columns)
+            if missing.any():
+                # Copy first: X may be the caller's own array
+                X = X.copy()
+                X[:, self._fill_index] = np.where(missing, self._fill_values, columns)
+        return X
+
+    def predict_proba(self, X):
+        import numpy as np
+
+        p_high = self.booster.inplace_predict(self._as_matrix(X), iteration_range=self.iteration_range,
+                                            validate_features=False)
+        return np.column_stack([1.0 - p_high, p_high])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+    def predict_contributions(self, X):
+        """Tree-path SHAP values per row (last column is the bias), in log-odds"""
+        import xgboost as xgb
+
+        matrix = xgb.DMatrix(self._as_matrix(X), feature_names=self.feature_names)
+        return self.booster.predict(matrix, pred_contribs=True, iteration_range=self.iteration_range)
+
+    @property
+    def feature_importances_(self):
+        """Gain importances normalised to sum to 1, matching XGBClassifier's default"""
+        import numpy as np
+
+        if self._feature_importances is None:
+            scores = self.booster.get_score(importance_type="gain")
+            importance = np.array([scores.get(name, 0.0) for name in self.feature_names], dtype=np.float32)
+            total = importance.sum()
+            self._feature_importances = importance / total if total > 0 else importance
+        return self._feature_importances
+
+class FeatureImportance:
+    """A model's global feature importances, sorted and ranked once at load time
+
+    Importances are fixed per artifact, so pages and the predictor read the
+    pre-sorted order, rank table and display frame instead of re-sorting
+    feature_importances_ on every request.
+    """
+
+    def __init__(self, features, values):
+        import numpy as np
+        import pandas as pd
+
+        self.features = list(features)
+        self.values = np.asarray(values, dtype=np.float64)
+        if len(self.features) != len(self.values):
+            raise ValueError(f"{len(self.values)} importances for {len(self.features)} features")
+        self.values.setflags(write=False)
+        # Descending importance; stable so ties keep training column order
+        self.order = np.argsort(-self.values, kind="mergesort")
+        self.ranks = np.empty(len(self.values), dtype=np.intp)
+        self.ranks[self.order] = np.arange(1, len(self.values) + 1)
+        self.rank_of = {name: int(rank) for name, rank in zip(self.features, self.ranks)}
+        self.by_feature = dict(zip(self.features, self.values.tolist()))
+        self.frame = pd.DataFrame({
+            "Feature": [self.features[i] for i in self.order],
+            "Importance": self.values[self.order],
+            "Rank": np.arange(1, len(self.values) + 1)
+        })
+
+    @classmethod
+    def from_model(cls, model, features):
+        """Importances of a fitted model, or None if it does not expose feature_importances_"""
+        values = getattr(model, "feature_importances_", None)
+        if values is None or not features:
+            return None
+        return cls(features, values)
+
+    @property
+    def max(self):
+        return float(self.values[self.order[0]]) if len(self.values) else 0.0
+
+    def top(self, n=10):
+        """Most important features first, as a (Feature, Importance, Rank) frame"""
+        return self.frame.head(n)
+
+class ModelEntry:
+    """A loaded model artifact plus its load-time bookkeeping"""
+
+    def __init__(self, name, path, model, feature_columns, load_seconds, rss_bytes, artifact_format="pickle",
+                artifact_hash=None, stat_signature=None, importance=None, watched_files=None):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.feature_columns = feature_columns
+        self.load_seconds = load_seconds
+        self.rss_bytes = rss_bytes
+        self.artifact_format = artifact_format
+        self.artifact_hash = artifact_hash
+        self.stat_signature = stat_signature
+        self.importance = importance
+        # Resolved once at load; staleness checks only stat these, at most every STALE_CHECK_SECONDS
+        self.watched_files = watched_files or []
+        self.checked_at = time.monotonic()
+
+class ModelRegistry:
+    """Process-wide, lazily populated cache of model artifacts
+
+    Each artifact is loaded at most once per process, on first request, so a
+    page that needs one model never pays for the others.
+    """
+
+    def __init__(self, model_dir=current_dir, model_files=MODEL_FILES):
+        self.model_dir = Path(model_dir)
+        self.model_files = dict(model_files)
+        self._entries = {}
+        # One lock for all loads keeps the per-model RSS deltas from overlapping
+        self._load_lock = threading.Lock()
+
+    def path_for(self, name):
+        """Artifact path for a registered model name"""
+        if name not in self.model_files:
+            raise KeyError(f"Unknown model '{name}'. Available: {', '.join(self.model_files)}")
+        return self.model_dir / self.model_files[name]
+
+    def has_native(self, name):
+        """Whether a native XGBoost export exists for `name`"""
+        return manifest_path_for(self.path_for(name)).exists()
+
+    def get(self, name, reload_if_changed=False):
+        """Return the ModelEntry for `name`, loading it on first use
+
+        With reload_if_changed, the artifact files are stat'ed (at most once
+        every STALE_CHECK_SECONDS per model) and the model is reloaded, getting
+        a new artifact_hash, if they changed on disk.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and not (reload_if_changed and self._is_stale(entry)):
+            return entry
+
+        with self._load_lock:
+            current = self._entries.get(name)
+            # Load unless another thread already replaced the missing or stale entry meanwhile
+            if current is None or current is entry:
+                current = self._load(name)
+                self._entries[name] = current
+        return current
+
+    def _is_stale(self, entry):
+        """Whether the files behind a loaded entry changed since it was loaded (rate-limited)"""
+        now = time.monotonic()
+        if now - entry.checked_at < STALE_CHECK_SECONDS:
+            return False
+        entry.checked_at = now
+        return _stat_signature(entry.watched_files) != entry.stat_signature
+
+    def get_model(self, name):
+        """Return just the model object for `name`"""
+        return self.get(name).model
+
+    def get_models(self, names=None):
+        """Return {name: model} for the requested names (all registered models by default)"""
+        names = list(self.model_files) if names is None else names
+        return {name: self.get_model(name) for name in names}
+
+    def get_importance(self, name):
+        """Precomputed FeatureImportance for `name`, or None if the model has none"""
+        return self.get(name).importance
+
+    def is_loaded(self, name):
+        """Whether `name` has already been loaded in this process"""
+        return name in self._entries
+
+    def unload(self, name):
+        """Drop a model from the registry so its memory can be reclaimed"""
+        with self._load_lock:
+            self._entries.pop(name, None)
+
+    def memory_report(self):
+        """One row per registered model: load state, file size, RSS added by loading and load time"""
+        report = []
+        for name in self.model_files:
+            entry = self._entries.get(name)
+            path = entry.path if entry else self.path_for(name)
+            report.append({
+                "model": name,
+                "loaded": entry is not None,
+                "format": entry.artifact_format if entry else None,
+                "file_bytes": path.stat().st_size if path.exists() else None,
+                "rss_bytes": entry.rss_bytes if entry else None,
+                "load_seconds": entry.load_seconds if entry else None
+            })
+        return report
+
+    def _load(self, name):
+        """Load one artifact from disk, preferring a native XGBoost export over the pickle
+
+        Must be called with the load lock held.
+        """
+        path = self.path_for(name)
+        try:
+            manifest_path = manifest_path_for(path)
+            files = _artifact_files(path)
+            watched_files = _watched_files(path, files)
+            stat_signature = _stat_signature(watched_files)
+            rss_before = _current_rss()
+            start = time.perf_counter()
+            if manifest_path.exists():
+                model = NativeXGBoostModel.load(manifest_path)
+                feature_columns = model.feature_names
+                path, artifact_format = manifest_path.parent / model.manifest["model_file"], "native"
+            else:
+                import joblib
+
+                # Verify model file exists
+                if not path.exists():
+                    raise FileNotFoundError(f"Model file not found at {path}")
+                model, feature_columns = _unwrap_model(joblib.load(path))
+                artifact_format = "pickle"
+            load_seconds = time.perf_counter() - start
+            rss_after = _current_rss()
+            artifact_hash = _hash_files(files)
+        except Exception as e:
+            raise RuntimeError(f"Failed to load model '{name}': {str(e)}")
+
+        rss_bytes = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        try:
+            from feature_pipeline import MODEL_COLUMNS
+
+            importance = FeatureImportance.from_model(model, feature_columns or MODEL_COLUMNS)
+        except (AttributeError, ValueError):
+            # Pipelines whose final step exposes no importances
+            importance = None
+        return ModelEntry(name, path, model, feature_columns, load_seconds, rss_bytes, artifact_format,
+                        artifact_hash, stat_signature, importance, watched_files)
+
+# Shared instance imported by the predictor and all pages
+registry = ModelRegistry()
@@ -3,12 +3,22 @@ import pandas as pd
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from chart_cache import chart_cache
 try:
     from stroke_predictor_pkl import predict_stroke_risk
 except ModuleNotFoundError:
     st.error("Could not import 'stroke_predictor_pkl'. Please ensure the file exists in the parent directory and is named correctly.")
     def predict_stroke_risk(*args, **kwargs):
         raise ImportError("stroke_predictor_pkl module not found.")
+# The what-if engine scores through stroke_predictor_pkl; without it the scenario and heatmap sections report the error
+try:
+    from what_if_engine import AXIS_LABELS, ScenarioSession, what_if_grid
+except ModuleNotFoundError:
+    AXIS_LABELS = {}
+    def ScenarioSession(*args, **kwargs):
+        raise ImportError("what_if_engine module could not be imported.")
+    def what_if_grid(*args, **kwargs):
+        raise ImportError("what_if_engine module could not be imported.")
 
 def patient_data_entry():
     st.set_page_config(page_title="Patient Data Entry", layout="wide")
@@ -68,7 +78,8 @@ def patient_data_entry():
         
         try:
             with st.spinner("Calculating stroke risk..."):
-                result = predict_stroke_risk(patient_data)
+                # With a patient ID the assessment is also saved for the Patient Records page
+                result = predict_stroke_risk(patient_data, patient_id=patient_id)
                 
                 if result.get('status') != 'success':
                     raise ValueError(result.get('error', 'Prediction failed'))
@@ -85,6 +96,12 @@ def patient_data_entry():
                 
                 st.success("Assessment completed!")
                 st.balloons()
+            
+            # A storage problem is reported alongside the result rather than hiding it
+            if result.get('record_error'):
+                st.warning(result['record_error'])
+            elif not patient_id.strip():
+                st.info("Enter a Patient ID/Name to save this assessment to the patient records.")
                 
         except Exception as e:
             st.error(f"Assessment failed: {str(e)}")
@@ -127,31 +144,28 @@ def display_results():
     with col2:
         new_bmi = st.slider("Adjust BMI", 10.0, 50.0, float(input_data['bmi']), key="what_if_bmi")
     
-    if st.button("Run Scenario", key="scenario_button"):
-        try:
-            with st.spinner("Calculating..."):
-                modified_data = input_data.copy()
-                modified_data.update({'age': new_age, 'bmi': new_bmi})
-                
-                new_result = predict_stroke_risk(modified_data)
-                if new_result.get('status') != 'success':
-                    raise ValueError(new_result.get('error', 'Scenario analysis failed'))
-                
-                # Display comparison
-                st.markdown("#### Scenario Results")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Original Risk", result['probability_percent'])
-                with col2:
-                    change = (new_result['probability_raw'] - result['probability_raw']) * 100
-                    st.metric("New Risk", new_result['probability_percent'],
-                            delta=f"{change:+.1f}%")
-                
-                if change > 5:  # Significant change threshold
-                    st.warning(f"Major risk change detected ({change:+.1f}%)")
-                
-        except Exception as e:
-            st.error(f"Scenario analysis failed: {str(e)}")
+    # Updates live: each slider move patches the encoded base row and re-scores it
+    try:
+        scenario = get_scenario_session(input_data).score({'age': new_age, 'bmi': new_bmi})
+        new_result = scenario['details']
+        
+        # Display comparison
+        st.markdown("#### Scenario Results")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Original Risk", result['probability_percent'])
+        with col2:
+            change = (new_result['probability_raw'] - result['probability_raw']) * 100
+            st.metric("New Risk", new_result['probability_percent'],
+                    delta=f"{change:+.1f}%")
+        
+        if change > 5:  # Significant change threshold
+            st.warning(f"Major risk change detected ({change:+.1f}%)")
+            
+    except Exception as e:
+        st.error(f"Scenario analysis failed: {str(e)}")
+    
+    display_sensitivity_heatmap(input_data)
     
     # Advanced Analysis Button (only shown after initial assessment)
     st.divider()
@@ -160,5 +174,62 @@ def display_results():
         st.session_state.analysis_ready = True
         st.switch_page("pages/03_Risk_Assessment_Results.py")
 
+def get_scenario_session(input_data):
+    """Encoded base patient for the scenario sliders, built once per assessment"""
+    key = tuple(sorted(input_data.items()))
+    cached = st.session_state.get('scenario_session')
+    if cached is None or cached[0] != key:
+        cached = (key, ScenarioSession(input_data))
+        st.session_state.scenario_session = cached
+    return cached[1]
+
+def get_risk_surface(input_data):
+    """Whole age x BMI x glucose grid for this patient, scored once and kept in the session"""
+    key = tuple(sorted(input_data.items()))
+    cached = st.session_state.get('risk_surface')
+    if cached is None or cached[0] != key:
+        cached = (key, what_if_grid(input_data))
+        st.session_state.risk_surface = cached
+    return cached[1]
+
+def plot_sensitivity_heatmap(fig, ax, table, x_field, y_field, marker):
+    image = ax.imshow(table.to_numpy() * 100, origin='lower', aspect='auto', cmap='RdYlGn_r', vmin=0, vmax=100)
+    ax.set_xticks(range(len(table.columns)))
+    ax.set_xticklabels([f"{v:g}" for v in table.columns], rotation=45)
+    ax.set_yticks(range(len(table.index)))
+    ax.set_yticklabels([f"{v:g}" for v in table.index])
+    ax.set_xlabel(AXIS_LABELS[x_field])
+    ax.set_ylabel(AXIS_LABELS[y_field])
+    # Mark the patient's current profile
+    ax.plot(*marker, marker='*', color='black', markersize=14)
+    fig.colorbar(image, ax=ax, label="Stroke risk (%)")
+
+def display_sensitivity_heatmap(input_data):
+    st.markdown("#### Sensitivity Heatmap")
+    try:
+        with st.spinner("Scoring scenario grid..."):
+            surface = get_risk_surface(input_data)
+    except Exception as e:
+        st.error(f"Sensitivity analysis failed: {str(e)}")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        x_field = st.selectbox("Horizontal axis", surface.fields, index=0,
+                            format_func=AXIS_LABELS.get, key="heatmap_x")
+    with col2:
+        y_options = [field for field in surface.fields if field != x_field]
+        y_field = st.selectbox("Vertical axis", y_options, index=0,
+                            format_func=AXIS_LABELS.get, key="heatmap_y")
+    fixed_field = next(field for field in surface.fields if field not in (x_field, y_field))
+    
+    table = surface.slice(x_field, y_field)
+    marker = (list(table.columns).index(input_data[x_field]), list(table.index).index(input_data[y_field]))
+    st.image(chart_cache.png("sensitivity_heatmap", (x_field, y_field, table, marker),
+                            lambda fig, ax: plot_sensitivity_heatmap(fig, ax, table, x_field, y_field, marker),
+                            figsize=(10, 5)))
+    st.caption(f"{len(surface):,} scenarios scored in one pass; {AXIS_LABELS[fixed_field]} held at "
+            f"{input_data[fixed_field]:g}. ★ marks the current profile.")
+
 if __name__ == "__main__":
     patient_data_entry()
\ No newline at end of file
@@ -1,84 +1,136 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 from pathlib import Path
-import matplotlib.pyplot as plt
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from model_registry import registry
+from feature_pipeline import feature_pipeline
+from stroke_predictor_pkl import explain_stroke_risk
+from chart_cache import chart_cache
+
+ANALYSIS_MODELS = ["Random Forest", "XGBoost", "Extra Trees"]
+# Seconds to wait for the consensus before reporting the remaining models as timed out
+MODEL_TIMEOUT_SECONDS = 5.0
 
 # --- Model Loading System ---
-@st.cache_resource
-def load_models():
-    """Load all individual models for analysis"""
+def predict_with_model(name, model, processed_data):
+    """Score one loaded model; runs on the consensus call's own worker threads"""
+    proba = model.predict_proba(processed_data)[0]
+    return {
+        "Low Risk": float(proba[0]),
+        "High Risk": float(proba[1]),
+        # Sorted and ranked once when the model was loaded
+        "Features": registry.get_importance(name)
+    }
+
+def run_consensus(processed_data, timeout=MODEL_TIMEOUT_SECONDS):
+    """Score all analysis models concurrently; returns (results, {model: failure reason})
+
+    Models are loaded (once per process) before the deadline starts, so a cold
+    start is not reported as a timeout. Each call gets its own threads and
+    does not wait for them on exit: a model that hangs only holds its own
+    thread, never a slot other sessions or later reruns need. A model that
+    raises or misses the deadline is left out, so the page shows a partial
+    consensus instead of blocking on it.
+    """
+    models, failures = {}, {}
+    for name in ANALYSIS_MODELS:
+        try:
+            models[name] = registry.get_model(name)
+        except Exception as e:
+            failures[name] = str(e)
+    if not models:
+        return {}, failures
+    
+    # Tree-ensemble inference releases the GIL, so threads score in parallel
+    pool = ThreadPoolExecutor(max_workers=len(models), thread_name_prefix="consensus")
     try:
-        model_dir = Path(__file__).resolve().parent.parent
+        futures = {pool.submit(predict_with_model, name, model, processed_data): name
+                for name, model in models.items()}
+        done, not_done = wait(futures, timeout=timeout)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    results = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            failures[name] = str(e)
+    for future in not_done:
+        failures[futures[future]] = f"timed out after {timeout:.0f}s"
+    
+    # Keep the display order stable regardless of completion order
+    return {name: results[name] for name in ANALYSIS_MODELS if name in results}, failures
 
-        return {
-            "Random Forest": joblib.load(model_dir / "strokerisk_model_rf.pkl"),
-            "XGBoost": joblib.load(model_dir / "strokerisk_model_xgboost.pkl"),
-            "Extra Trees": joblib.load(model_dir / "strokerisk_model_et.pkl")
-        }
-    except Exception as e:
-        st.error(f"Model loading failed: {str(e)}")
-        st.stop()
+# --- Charts ---
+def plot_risk_probability(fig, ax, probabilities):
+    """High Risk probability per model; `probabilities` maps model -> (low, high)"""
+    for model, (_, high) in probabilities.items():
+        ax.bar(model, high, color='#FF6B6B')
+    ax.set_ylim(0, 1)
+    ax.set_ylabel("Probability")
+    ax.tick_params(axis='x', labelrotation=45)
 
-# --- Complete Feature Processing ---
-def preprocess_input(input_data):
-    """Prepare input matching the original training data features"""
-    processed = {
-        # Numerical features (standardized)
-        'age': float((input_data['age'] - 43.23) / 22.61),
-        'avg_glucose_level': float((input_data['avg_glucose_level'] - 106.15) / 45.28),
-        'bmi': float((input_data['bmi'] - 28.89) / 7.85),
-        
-        # Binary features
-        'hypertension': int(input_data.get('hypertension', 0)),
-        'heart_disease': int(input_data.get('heart_disease', 0)),
-        
-        # Gender (only Male/Other as per training data)
-        'gender_Male': int(input_data.get('gender') == 'Male'),
-        'gender_Other': int(input_data.get('gender') == 'Other'),
-        
-        # Marriage status (only Yes as per training data)
-        'ever_married_Yes': int(input_data.get('ever_married') == 'Yes'),
-        
-        # Work type (excluding Govt_job)
-        'work_type_Never_worked': int(input_data.get('work_type') == 'Never_worked'),
-        'work_type_Private': int(input_data.get('work_type') == 'Private'),
-        'work_type_Self-employed': int(input_data.get('work_type') == 'Self-employed'),
-        'work_type_children': int(input_data.get('work_type') == 'children'),
-        
-        # Residence type (only Urban)
-        'Residence_type_Urban': int(input_data.get('Residence_type') == 'Urban'),
-        
-        # Smoking status (excluding Unknown)
-        'smoking_status_formerly smoked': int(input_data.get('smoking_status') == 'formerly smoked'),
-        'smoking_status_never smoked': int(input_data.get('smoking_status') == 'never smoked'),
-        'smoking_status_smokes': int(input_data.get('smoking_status') == 'smokes'),
-        
-        # Age groups
-        'age_group_19-30': int(19 <= input_data['age'] <= 30),
-        'age_group_31-45': int(31 <= input_data['age'] <= 45),
-        'age_group_46-60': int(46 <= input_data['age'] <= 60),
-        'age_group_61-75': int(61 <= input_data['age'] <= 75),
-        'age_group_76+': int(input_data['age'] > 75)
-    }
+def plot_model_agreement(fig, ax, probabilities):
+    """Stacked Low/High Risk probabilities per model"""
+    pd.DataFrame(probabilities, index=["Low Risk", "High Risk"]).T.plot(
+        kind='bar', stacked=True, ax=ax, 
+        color=['#4ECDC4', '#FF6B6B'])
+    ax.set_ylabel("Probability")
+
+def plot_top_features(fig, ax, name, top):
+    top.plot.barh(x="Feature", y="Importance", ax=ax, color='#1F77B4')
+    ax.set_title(f"Top 10 Predictive Features ({name})")
+
+# --- Patient Attribution Display ---
+FIELD_LABELS = {
+    'age': "Age", 'avg_glucose_level': "Glucose level", 'bmi': "BMI",
+    'hypertension': "Hypertension", 'heart_disease': "Heart disease", 'gender': "Gender",
+    'ever_married': "Ever married", 'work_type': "Work type", 'Residence_type': "Residence",
+    'smoking_status': "Smoking status"
+}
+# Contributions smaller than this (in log-odds) are not listed as factors
+MIN_CONTRIBUTION = 0.05
+MAX_FACTORS = 4
+
+def describe_factor(field, input_data):
+    """Readable label for one input field with this patient's value"""
+    value = input_data.get(field)
+    if field in ('hypertension', 'heart_disease'):
+        value = "yes" if value else "no"
+    elif field == 'age':
+        value = f"{value} years"
+    elif field == 'avg_glucose_level':
+        value = f"{value:.1f} mg/dL"
+    return f"{FIELD_LABELS.get(field, field)} ({value})"
+
+def rule_based_factors(input_data):
+    """Fallback risk/protective factors when no attribution model is available"""
+    risk_factors = []
+    protective_factors = []
     
-    # Ensure all features are in correct order
-    feature_columns = [
-        'age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi',
-        'gender_Male', 'gender_Other',
-        'ever_married_Yes',
-        'work_type_Never_worked', 'work_type_Private',
-        'work_type_Self-employed', 'work_type_children',
-        'Residence_type_Urban',
-        'smoking_status_formerly smoked', 'smoking_status_never smoked', 'smoking_status_smokes',
-        'age_group_19-30', 'age_group_31-45', 'age_group_46-60',
-        'age_group_61-75', 'age_group_76+'
-    ]
+    # Identify key factors
+    if input_data['age'] > 60:
+        risk_factors.append(f"Age ({input_data['age']} years)")
+    if input_data['hypertension']:
+        risk_factors.append("Hypertension")
+    if input_data['avg_glucose_level'] > 140:
+        risk_factors.append(f"High glucose ({input_data['avg_glucose_level']:.1f} mg/dL)")
+    if input_data['smoking_status'] in ['formerly smoked', 'smokes']:
+        risk_factors.append("Smoking history")
     
-    return pd.DataFrame([processed], columns=feature_columns)
+    if input_data['age'] < 40:
+        protective_factors.append("Younger age")
+    if not input_data['hypertension']:
+        protective_factors.append("No hypertension")
+    if input_data['smoking_status'] == 'never smoked':
+        protective_factors.append("Never smoked")
+    return risk_factors, protective_factors
 
 # --- Analysis Page ---
 def risk_analysis_engine():
@@ -92,28 +144,21 @@ def risk_analysis_engine():
             st.switch_page("pages/02_Patient_Data_Entry.py")
         return
 
-    # Load models and data
-    models = load_models()
+    # Load patient data
     input_data = st.session_state["patient_data"]
-    processed_data = preprocess_input(input_data)
+    # Same encoding as the predictor and batch tools
+    processed_data = feature_pipeline.transform_frame([input_data])
     
     # --- Model Predictions ---
-    results = {}
-    for name, model in models.items():
-        try:
-            proba = model.predict_proba(processed_data)[0]
-            results[name] = {
-                "Low Risk": float(proba[0]),
-                "High Risk": float(proba[1]),
-                "Features": {k: float(v) for k, v in zip(processed_data.columns, model.feature_importances_)}
-            }
-        except Exception as e:
-            st.error(f"{name} model failed: {str(e)}")
-            continue
+    results, failures = run_consensus(processed_data)
+    for name, reason in failures.items():
+        st.error(f"{name} model failed: {reason}")
     
     if not results:
         st.error("All models failed to predict. Check model compatibility.")
         return
+    if failures:
+        st.info(f"Partial consensus: based on {len(results)} of {len(ANALYSIS_MODELS)} models.")
     
     # Summary Section
     with st.expander("📊 Risk Summary", expanded=True):
@@ -127,24 +172,20 @@ def risk_analysis_engine():
         
         col1, col2 = st.columns([1, 2])
         
+        # Charts are rendered once per distinct set of probabilities, then served as PNG bytes
+        probabilities = {name: (r["Low Risk"], r["High Risk"]) for name, r in results.items()}
+        
         with col1:
             st.subheader("Risk Probability")
-            fig1, ax1 = plt.subplots(figsize=(6, 4))
-            for model in results:
-                ax1.bar(model, results[model]["High Risk"], color='#FF6B6B')
-            ax1.set_ylim(0, 1)
-            ax1.set_ylabel("Probability")
-            plt.xticks(rotation=45)
-            st.pyplot(fig1)
+            st.image(chart_cache.png("risk_probability", probabilities,
+                                    lambda fig, ax: plot_risk_probability(fig, ax, probabilities),
+                                    figsize=(6, 4)))
         
         with col2:
             st.subheader("Model Agreement")
-            fig2, ax2 = plt.subplots(figsize=(8, 4))
-            pd.DataFrame(results).T[["Low Risk", "High Risk"]].plot(
-                kind='bar', stacked=True, ax=ax2, 
-                color=['#4ECDC4', '#FF6B6B'])
-            ax2.set_ylabel("Probability")
-            st.pyplot(fig2)
+            st.image(chart_cache.png("model_agreement", probabilities,
+                                    lambda fig, ax: plot_model_agreement(fig, ax, probabilities),
+                                    figsize=(8, 4)))
     
     # --- Feature Importance ---
     with st.expander("🔍 Feature Analysis"):
@@ -152,56 +193,48 @@ def risk_analysis_engine():
         
         for (name, model_data), tab in zip(results.items(), tabs):
             with tab:
-                importance = pd.DataFrame({
-                    "Feature": model_data["Features"].keys(),
-                    "Importance": [float(v) for v in model_data["Features"].values()]
-                }).sort_values("Importance", ascending=False)
-                
+                importance = model_data["Features"]
                 st.subheader(f"{name} Key Drivers")
+                if importance is None:
+                    st.info(f"{name} does not expose feature importances.")
+                    continue
                 
                 # Top 10 features visualization
-                fig, ax = plt.subplots(figsize=(8, 6))
-                importance.head(10).plot.barh(x="Feature", y="Importance", ax=ax, color='#1F77B4')
-                ax.set_title(f"Top 10 Predictive Features ({name})")
-                st.pyplot(fig)
+                top = importance.top(10)
+                st.image(chart_cache.png("analysis_top_features", (name, top),
+                                        lambda fig, ax: plot_top_features(fig, ax, name, top),
+                                        figsize=(8, 6)))
                 
-                # Full feature table
-                importance["Importance"] = importance["Importance"].astype(float)
+                # Full feature table; the progress column already shades each row
                 st.dataframe(
-                    importance.style.background_gradient(cmap='Blues'),
+                    importance.frame,
                     height=400,
+                    hide_index=True,
                     column_config={
                         "Feature": "Risk Factor",
                         "Importance": st.column_config.ProgressColumn(
                             "Importance",
                             format="%.3f",
                             min_value=0.0,
-                            max_value=float(importance["Importance"].max())
+                            max_value=importance.max
                         )
                     }
                 )
     
     # --- Clinical Interpretation ---
     with st.expander("💡 Clinical Insights & Recommendations"):
-        risk_factors = []
-        protective_factors = []
-        
-        # Identify key factors
-        if input_data['age'] > 60:
-            risk_factors.append(f"Age ({input_data['age']} years)")
-        if input_data['hypertension']:
-            risk_factors.append("Hypertension")
-        if input_data['avg_glucose_level'] > 140:
-            risk_factors.append(f"High glucose ({input_data['avg_glucose_level']:.1f} mg/dL)")
-        if input_data['smoking_status'] in ['formerly smoked', 'smokes']:
-            risk_factors.append("Smoking history")
-        
-        if input_data['age'] < 40:
-            protective_factors.append("Younger age")
-        if not input_data['hypertension']:
-            protective_factors.append("No hypertension")
-        if input_data['smoking_status'] == 'never smoked':
-            protective_factors.append("Never smoked")
+        # Identify key factors from this patient's own attribution
+        explanation = explain_stroke_risk(input_data)
+        if explanation["status"] == "success":
+            contributions = explanation["contributions"]
+            risk_factors = [describe_factor(field, input_data) for field, value in contributions.items()
+                            if value >= MIN_CONTRIBUTION][:MAX_FACTORS]
+            protective_factors = [describe_factor(field, input_data) for field, value in contributions.items()
+                                if value <= -MIN_CONTRIBUTION][:MAX_FACTORS]
+        else:
+            st.caption(f"Per-patient attribution unavailable ({explanation['error']}); "
+                    "showing rule-based factors.")
+            risk_factors, protective_factors = rule_based_factors(input_data)
         
         st.write(f"""
         - **Consensus Risk**: {avg_risk:.1f}% average across models
@@ -209,6 +242,12 @@ def risk_analysis_engine():
         - **Protective Factors**: {', '.join(protective_factors) if protective_factors else "None identified"}
         """)
         
+        if explanation["status"] == "success":
+            st.subheader(f"What Drives This Patient's Score ({explanation['model']})")
+            st.bar_chart(pd.Series(explanation["contributions"], name="Contribution (log-odds)")
+                        .rename(index=FIELD_LABELS))
+            st.caption("Positive values push towards High Risk, negative values towards Low Risk.")
+        
         # Recommendations
         st.subheader("Recommendations")
         if avg_risk > 30:
@@ -1,78 +1,118 @@
 import streamlit as st 
 import pandas as pd
 import numpy as np
-import joblib
 from pathlib import Path
-import matplotlib.pyplot as plt
-from sklearn.metrics import (roc_auc_score, f1_score, precision_score, 
-                            recall_score, accuracy_score, confusion_matrix, 
-                            classification_report, RocCurveDisplay)
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from model_registry import registry
+from evaluation_store import evaluation_store
+from dataset_cache import load_frame
+from threshold_engine import ThresholdSweep
+from system_settings import get_risk_threshold, save_risk_threshold
+from stroke_predictor_pkl import PREDICTOR_MODEL
+from chart_cache import chart_cache, figure_stats
+
+EVALUATED_MODELS = ["Ensemble", "Random Forest", "XGBoost", "Extra Trees"]
 
 # --- Model Loading System ---
-@st.cache_resource
 def load_models():
-    """Load all individual models for analysis"""
+    """Fetch all individual models for analysis from the shared registry"""
     try:
-        model_dir = Path(__file__).resolve().parent.parent
-
-        return {
-            "Ensemble": joblib.load(model_dir / "strokerisk_tune_ensemble_model.pkl"),
-            "Random Forest": joblib.load(model_dir / "strokerisk_model_rf.pkl"),
-            "XGBoost": joblib.load(model_dir / "strokerisk_model_xgboost.pkl"),
-            "Extra Trees": joblib.load(model_dir / "strokerisk_model_et.pkl")
-        }
+        return registry.get_models(EVALUATED_MODELS)
     except Exception as e:
         st.error(f"Model loading failed: {str(e)}")
         st.stop()
 
 # --- Model Evaluation Functions ---
-def evaluate_model(model, X, y):
-    """Calculate all metrics for a single model"""
+def evaluate_model(name, model, X, y, dataset_hash):
+    """Calculate all metrics for a single model, served from the evaluation store when possible"""
     try:
-        y_pred = model.predict(X)
-        y_proba = model.predict_proba(X)[:,1] if hasattr(model, "predict_proba") else None
-        
-        return {
-            'accuracy': accuracy_score(y, y_pred),
-            'roc_auc': roc_auc_score(y, y_proba) if y_proba is not None else None,
-            'f1_score': f1_score(y, y_pred),
-            'precision': precision_score(y, y_pred),
-            'recall': recall_score(y, y_pred),
-            'confusion_matrix': confusion_matrix(y, y_pred),
-            'classification_report': classification_report(y, y_pred, output_dict=True)
-        }
+        model_hash = registry.get(name).artifact_hash
+        return evaluation_store.get_or_compute(model, model_hash, X, y, dataset_hash)
     except Exception as e:
-        st.error(f"Evaluation failed for {model.__class__.__name__}: {str(e)}")
+        st.error(f"Evaluation failed for {name}: {str(e)}")
         return None
 
-def plot_roc_curves(models, X, y):
-    """Plot ROC curves for all models"""
-    fig, ax = plt.subplots(figsize=(8, 6))
-    for name, model in models.items():
-        if hasattr(model, "predict_proba"):
-            try:
-                RocCurveDisplay.from_estimator(model, X, y, name=name, ax=ax)
-            except Exception as e:
-                st.warning(f"Could not plot ROC for {name}: {str(e)}")
+def plot_roc_curves(fig, ax, models_metrics):
+    """Plot ROC curves for all models from their stored ROC points (models without any are skipped)"""
+    for name, metrics in models_metrics.items():
+        roc = metrics.get('roc_curve')
+        if roc is None:
+            continue
+        ax.plot(roc['fpr'], roc['tpr'], label=f"{name} (AUC = {metrics['roc_auc']:.2f})")
     ax.plot([0, 1], [0, 1], linestyle='--', color='gray')
+    ax.set_xlabel('False Positive Rate')
+    ax.set_ylabel('True Positive Rate')
     ax.set_title('ROC Curve Comparison')
-    return fig
+    ax.legend(loc='lower right')
+
+def plot_pr_curves(fig, ax, models_metrics):
+    """Plot precision-recall curves for all models from their stored curve points"""
+    for name, metrics in models_metrics.items():
+        pr = metrics['pr_curve']
+        ax.plot(pr['recall'], pr['precision'], label=f"{name} (AP = {metrics['average_precision']:.2f})")
+    ax.set_xlabel('Recall')
+    ax.set_ylabel('Precision')
+    ax.set_title('Precision-Recall Comparison')
+    ax.legend(loc='lower left')
+
+def plot_metric_comparison(fig, ax, metric_choice, names, values):
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+    bars = ax.bar(names, values, color=colors[:len(names)])
+    ax.set_title(f'{metric_choice.upper()} Comparison')
+    ax.set_ylim(0, 1)
+    
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height,
+                f'{height:.3f}',
+                ha='center', va='bottom')
+
+def plot_confusion_matrix(fig, ax, cm):
+    ax.imshow(cm, cmap='Blues')
+    ax.set_xticks([0, 1])
+    ax.set_yticks([0, 1])
+    ax.set_xticklabels(['Low Risk', 'High Risk'])
+    ax.set_yticklabels(['Low Risk', 'High Risk'])
+    ax.set_xlabel('Predicted')
+    ax.set_ylabel('Actual')
+    
+    for i in range(2):
+        for j in range(2):
+            ax.text(j, i, cm[i, j], ha='center', va='center', 
+                    color='white' if cm[i, j] > cm.max()/2 else 'black')
+
+def plot_threshold_sweep(fig, ax, sweep, threshold):
+    curve = sweep.to_frame()
+    for key in ['precision', 'recall', 'f1_score', 'alert_rate']:
+        ax.plot(curve['threshold'], curve[key], label=key)
+    ax.axvline(threshold, color='black', linestyle='--', label='selected')
+    ax.set_xlabel('Threshold')
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1.05)
+    ax.legend(loc='best')
+
+def plot_top_features(fig, ax, name, top):
+    top.plot.barh(x='Feature', y='Importance', ax=ax, color='#1f77b4')
+    ax.set_title(f'Top 10 Features - {name}')
+
+@st.cache_resource
+def get_threshold_sweep(name, model_hash, dataset_hash, _y, _scores):
+    """Sorted-once threshold sweep per model/dataset pair (reused by every slider move)"""
+    return ThresholdSweep(_y, _scores)
 
 # --- Data Loading Helper ---
 def load_models_and_data():
-    """Load models and validation data"""
+    """Load models and the memory-mapped validation data"""
     models = load_models()
-    # Adjust the path to your validation data as needed
-    data_dir = Path(__file__).resolve().parent.parent
     try:
-        val_df = pd.read_csv("stroke_data_smoted_scaled_for_pycaret.csv")
-        # Assume the target column is named 'stroke'
-        X_val = val_df.drop(columns=['stroke'])
-        y_val = val_df['stroke']
+        # Converted once from stroke_data_smoted_scaled_for_pycaret.csv, then memory-mapped
+        X_val, y_val, dataset_hash = load_frame("validation")
     except Exception as e:
         st.error(f"Validation data loading failed: {str(e)}")
         st.stop()
-    return models, X_val, y_val
+    return models, X_val, y_val, dataset_hash
 
 # --- Main Page ---
 def model_performance_page():
@@ -80,13 +120,13 @@ def model_performance_page():
     st.title("🧪 Live Model Evaluation")
     
     # Load models and validation data
-    models, X_val, y_val = load_models_and_data()
+    models, X_val, y_val, dataset_hash = load_models_and_data()
     
-    # Calculate all metrics
+    # Calculate all metrics (computed once per model/dataset pair, then served from the store)
     with st.spinner("Computing live metrics..."):
         models_metrics = {}
         for name, model in models.items():
-            metrics = evaluate_model(model, X_val, y_val)
+            metrics = evaluate_model(name, model, X_val, y_val, dataset_hash)
             if metrics is not None:
                 models_metrics[name] = metrics
     
@@ -102,30 +142,31 @@ def model_performance_page():
             st.markdown("### Key Metrics")
             metric_choice = st.selectbox(
                 "Select metric", 
-                ['accuracy', 'roc_auc', 'f1_score', 'precision', 'recall']
+                ['accuracy', 'roc_auc', 'f1_score', 'precision', 'recall', 'specificity', 'average_precision']
             )
             
             # Bar chart comparison
-            fig, ax = plt.subplots(figsize=(6, 4))
             names = list(models_metrics.keys())
-            values = [m.get(metric_choice, 0) for m in models_metrics.values()]
-            
-            colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
-            bars = ax.bar(names, values, color=colors[:len(names)])
-            ax.set_title(f'{metric_choice.upper()} Comparison')
-            ax.set_ylim(0, 1)
-            
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{height:.3f}',
-                        ha='center', va='bottom')
-            
-            st.pyplot(fig)
+            values = [float(m.get(metric_choice, 0)) for m in models_metrics.values()]
+            st.image(chart_cache.png("metric_comparison", (metric_choice, names, values),
+                                    lambda fig, ax: plot_metric_comparison(fig, ax, metric_choice, names, values),
+                                    figsize=(6, 4)))
         
         with col2:
             st.markdown("### ROC Curves")
-            st.pyplot(plot_roc_curves(models, X_val, y_val))
+            # Curves are fixed per model artifact and dataset, so their hashes identify the chart
+            curve_key = (dataset_hash, {name: registry.get(name).artifact_hash for name in models_metrics})
+            roc_tab, pr_tab = st.tabs(["ROC", "Precision-Recall"])
+            with roc_tab:
+                # Outside the cached draw callback, which only runs when the chart is re-rendered
+                for name, metrics in models_metrics.items():
+                    if metrics.get('roc_curve') is None:
+                        st.warning(f"Could not plot ROC for {name}: model has no predict_proba")
+                st.image(chart_cache.png("roc_curves", curve_key,
+                                        lambda fig, ax: plot_roc_curves(fig, ax, models_metrics)))
+            with pr_tab:
+                st.image(chart_cache.png("pr_curves", curve_key,
+                                        lambda fig, ax: plot_pr_curves(fig, ax, models_metrics)))
     
     # --- Detailed Analysis ---
     with st.expander("🔍 Model-Specific Analysis"):
@@ -134,50 +175,83 @@ def model_performance_page():
         
         # Confusion Matrix
         st.markdown("#### Confusion Matrix")
-        cm = metrics['confusion_matrix']
-        fig, ax = plt.subplots(figsize=(4, 4))
-        im = ax.imshow(cm, cmap='Blues')
-        ax.set_xticks([0, 1])
-        ax.set_yticks([0, 1])
-        ax.set_xticklabels(['Low Risk', 'High Risk'])
-        ax.set_yticklabels(['Low Risk', 'High Risk'])
-        ax.set_xlabel('Predicted')
-        ax.set_ylabel('Actual')
-        
-        for i in range(2):
-            for j in range(2):
-                ax.text(j, i, cm[i, j], ha='center', va='center', 
-                        color='white' if cm[i, j] > cm.max()/2 else 'black')
-        
-        st.pyplot(fig)
+        cm = np.asarray(metrics['confusion_matrix'])
+        st.image(chart_cache.png("confusion_matrix", cm,
+                                lambda fig, ax: plot_confusion_matrix(fig, ax, cm), figsize=(4, 4)))
         
         # Classification Report
         st.markdown("#### Classification Report")
         report_df = pd.DataFrame(metrics['classification_report']).transpose()
         st.dataframe(report_df.style.background_gradient(cmap='Blues'))
     
+    # --- Decision Threshold ---
+    with st.expander("🎚️ Decision Threshold Tuning"):
+        threshold_models = list(models_metrics.keys())
+        threshold_model = st.selectbox(
+            "Select model", threshold_models,
+            index=threshold_models.index(PREDICTOR_MODEL) if PREDICTOR_MODEL in threshold_models else 0,
+            key="threshold_model_selector"
+        )
+        sweep = get_threshold_sweep(threshold_model, registry.get(threshold_model).artifact_hash,
+                                    dataset_hash, y_val.to_numpy(), models_metrics[threshold_model]['scores'])
+        
+        current_threshold = get_risk_threshold()
+        threshold = st.slider("High-Risk Alert Threshold", 0.01, 0.99, float(round(current_threshold, 2)), 0.01)
+        at_threshold = sweep.at(threshold)
+        
+        cols = st.columns(5)
+        for col, (label, key) in zip(cols, [("Precision", 'precision'), ("Recall", 'recall'),
+                                            ("F1", 'f1_score'), ("Specificity", 'specificity'),
+                                            ("Alert Rate", 'alert_rate')]):
+            col.metric(label, f"{at_threshold[key]*100:.1f}%")
+        
+        sweep_key = (threshold_model, registry.get(threshold_model).artifact_hash, dataset_hash, threshold)
+        st.image(chart_cache.png("threshold_sweep", sweep_key,
+                                lambda fig, ax: plot_threshold_sweep(fig, ax, sweep, threshold), figsize=(8, 4)))
+        
+        st.caption(f"Current saved threshold: {current_threshold:.0%} · "
+                f"Best F1 on validation data at {sweep.best('f1_score'):.2f}")
+        if threshold_model != PREDICTOR_MODEL:
+            st.info(f"Risk assessments are scored by the {PREDICTOR_MODEL} model; "
+                    "the saved threshold applies to that model.")
+        if st.button("Save as High-Risk Alert Threshold"):
+            save_risk_threshold(threshold)
+            st.success(f"High-Risk Alert Threshold set to {threshold:.0%}")
+    
+    # --- Model Memory ---
+    with st.expander("🧠 Model Memory"):
+        memory_df = pd.DataFrame(registry.memory_report())
+        memory_df["rss_mb"] = pd.to_numeric(memory_df["rss_bytes"]) / 1e6
+        memory_df["file_mb"] = pd.to_numeric(memory_df["file_bytes"]) / 1e6
+        st.dataframe(memory_df[["model", "loaded", "format", "file_mb", "rss_mb", "load_seconds"]])
+        
+        # Figure lifecycle: open_figures should stay at 0 between reruns
+        figures = figure_stats.snapshot()
+        cache = chart_cache.stats()
+        cols = st.columns(4)
+        cols[0].metric("Open Figures", figures["open_figures"] + figures["pyplot_open_figures"])
+        cols[1].metric("Charts Rendered", f"{figures['renders']:,}")
+        cols[2].metric("Bytes Rendered", f"{figures['bytes_rendered'] / 1e6:.1f} MB")
+        cols[3].metric("Chart Cache", f"{cache['bytes'] / 1e6:.1f} / {cache['max_bytes'] / 1e6:.0f} MB",
+                    help=f"{cache['entries']} charts, {cache['hits']:,} hits, {cache['misses']:,} misses")
+    
     # --- Feature Importance ---
     with st.expander("📌 Feature Importance"):
         model_choice = st.selectbox(
             "Select model for feature importance", 
-            [name for name, model in models.items() 
-                if hasattr(model, 'feature_importances_')],
+            [name for name in models if registry.get_importance(name) is not None],
             key="feature_importance_selector"
         )
         
         if model_choice in models:
-            model = models[model_choice]
-            importance = pd.DataFrame({
-                'Feature': X_val.columns,
-                'Importance': model.feature_importances_
-            }).sort_values('Importance', ascending=False)
-            
-            fig, ax = plt.subplots(figsize=(8, 6))
-            importance.head(10).plot.barh(x='Feature', y='Importance', ax=ax, color='#1f77b4')
-            ax.set_title(f'Top 10 Features - {model_choice}')
-            st.pyplot(fig)
+            # Sorted and ranked once when the model was loaded
+            importance = registry.get_importance(model_choice)
+            top = importance.top(10)
+            st.image(chart_cache.png("performance_top_features", (model_choice, top),
+                                    lambda fig, ax: plot_top_features(fig, ax, model_choice, top),
+                                    figsize=(8, 6)))
             
-            st.dataframe(importance.head(20).style.background_gradient(cmap='Blues'))
+            st.dataframe(importance.top(20).style.background_gradient(cmap='Blues', subset=['Importance']))
 
 if __name__ == "__main__":
     model_performance_page()
\ No newline at end of file
@@ -1,12 +1,73 @@
 import streamlit as st
+import pandas as pd
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from patient_store import patient_store
+
+PAGE_SIZE = 25
+# st.dataframe rows are 35px; size the grid to exactly one page so it never scrolls
+GRID_HEIGHT = 35 * (PAGE_SIZE + 1) + 3
+
+@st.cache_resource
+def get_prefetch_pool():
+    """One background worker shared across reruns for loading the next page"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="records-prefetch")
+
+def page_cursor(record):
+    """Cursor for the page after `record`: just its sort key"""
+    return {'assessed_at': record['assessed_at'], 'assessment_id': record['assessment_id']}
+
+def records_frame(records):
+    """The visible page as the grid's DataFrame"""
+    frame = pd.DataFrame(records, columns=["patient_id", "assessed_at", "age", "risk_level", "probability",
+                                           "history_summary"])
+    frame["assessed_at"] = pd.to_datetime(frame["assessed_at"])
+    frame["probability"] = frame["probability"] * 100
+    frame["profile"] = "/Patient_Profile"
+    return frame
+
+def embed_html(body_html, height):
+    """Embed a piece of the page's original markup with its fonts and Tailwind styles"""
+    st.components.v1.html(f"""
+    <html>
+    <head>
+        <link rel="preconnect" href="https://fonts.gstatic.com/" crossorigin="" />
+        <link
+            rel="stylesheet"
+            as="style"
+            onload="this.rel='stylesheet'"
+            href="https://fonts.googleapis.com/css2?display=swap&amp;family=Noto+Sans%3Awght%40400%3B500%3B700%3B900&amp;family=Public+Sans%3Awght%40400%3B500%3B700%3B900"
+        />
+
+        <title>Patient Records Management</title>
+        <link rel="icon" type="image/x-icon" href="data:image/x-icon;base64," />
+
+        <script src="https://cdn.tailwindcss.com?plugins=forms,container-queries"></script>
+        <style>
+            /* Ensure the body uses your specified fonts, even within the iframe */
+            body {{ font-family: "Public Sans", "Noto Sans", sans-serif; margin: 0; padding: 0; }}
+            header.px-10.py-3 {{
+                padding-left: 1rem !important;
+                padding-right: 1rem !important;
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="relative flex size-full flex-col bg-white group/design-root overflow-x-hidden" style='font-family: "Public Sans", "Noto Sans", sans-serif;'>
+            {body_html}
+        </div>
+    </body>
+    </html>
+    """, height=height)
 
 def patient_records_page():
     """
-    Renders the Patient Records Management page by embedding the complete
-    original HTML provided by the user using st.components.v1.html.
-    Adjustments have been made to the HTML's Tailwind classes and internal CSS
-    to ensure full-width rendering within the Streamlit application.
-    Includes a dynamic header and footer.
+    Renders the Patient Records Management page. The header, title and footer
+    keep the original HTML design (embedded with st.components.v1.html); the
+    records themselves are a Streamlit grid showing one page from the patient
+    store at a time.
     """
     # Define the header HTML content (consistent with other pages)
     header_html_content = """
@@ -52,202 +113,85 @@ def patient_records_page():
     </footer>
     """
 
-    full_html_content = f"""
-    <html>
-    <head>
-        <link rel="preconnect" href="https://fonts.gstatic.com/" crossorigin="" />
-        <link
-            rel="stylesheet"
-            as="style"
-            onload="this.rel='stylesheet'"
-            href="https://fonts.googleapis.com/css2?display=swap&amp;family=Noto+Sans%3Awght%40400%3B500%3B700%3B900&amp;family=Public+Sans%3Awght%40400%3B500%3B700%3B900"
-        />
-
-        <title>Patient Records Management</title>
-        <link rel="icon" type="image/x-icon" href="data:image/x-icon;base64," />
-
-        <script src="https://cdn.tailwindcss.com?plugins=forms,container-queries"></script>
-        <style>
-            /* Ensure the body uses your specified fonts, even within the iframe */
-            body {{ font-family: "Public Sans", "Noto Sans", sans-serif; margin: 0; padding: 0; }}
-            /* Ensure full height for the layout container within the iframe */
-            .relative.flex.size-full.min-h-screen.flex-col {{ min-height: 100vh; }}
-
-            /* Adjustments for width and padding within the embedded HTML */
-            .flex.flex-1.justify-center.py-5 {{
-                padding-left: 1rem !important;
-                padding-right: 1rem !important;
-            }}
-
-            .layout-content-container.flex.flex-col.flex-1 {{
-                max-width: 100% !important;
-                width: 100% !important;
-                padding-left: 1rem !important;
-                padding-right: 1rem !important;
-            }}
-
-            header.px-10.py-3 {{
-                padding-left: 1rem !important;
-                padding-right: 1rem !important;
-            }}
-
-            .table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120,
-            .table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240,
-            .table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360,
-            .table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480,
-            .table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600 {{
-                width: auto !important;
-            }}
-            table {{
-                width: 100%;
-                table-layout: fixed;
-            }}
-            /* Escaped curly braces for @container rules */
-            @container(max-width:120px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120{{display: none;}}}}
-            @container(max-width:240px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240{{display: none;}}}}
-            @container(max-width:360px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360{{display: none;}}}}
-            @container(max-width:480px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480{{display: none;}}}}
-            @container(max-width:600px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600{{display: none;}}}}
-        </style>
-    </head>
-    <body>
-        <div class="relative flex size-full min-h-screen flex-col bg-white group/design-root overflow-x-hidden" style='font-family: "Public Sans", "Noto Sans", sans-serif;'>
-            <div class="layout-container flex h-full grow flex-col">
-                {header_html_content}
-                <div class="flex flex-1 justify-center py-5 px-4">
-                    <div class="layout-content-container flex flex-col flex-1">
-                        <div class="flex flex-wrap justify-between gap-3 p-4">
-                            <div class="flex min-w-72 flex-col gap-3">
-                                <p class="text-[#121516] tracking-light text-[32px] font-bold leading-tight">Patient Records Management</p>
-                                <p class="text-[#6a7781] text-sm font-normal leading-normal">
-                                    Efficiently manage and update patient information to ensure accurate risk assessments and personalized care.
-                                </p>
-                            </div>
-                        </div>
-                        <div class="px-4 py-3">
-                            <label class="flex flex-col min-w-40 h-12 w-full">
-                                <div class="flex w-full flex-1 items-stretch rounded-xl h-full">
-                                    <div
-                                        class="text-[#6a7781] flex border-none bg-[#f1f2f4] items-center justify-center pl-4 rounded-l-xl border-r-0"
-                                        data-icon="MagnifyingGlass"
-                                        data-size="24px"
-                                        data-weight="regular"
-                                    >
-                                        <svg xmlns="http://www.w3.org/2000/svg" width="24px" height="24px" fill="currentColor" viewBox="0 0 256 256">
-                                            <path
-                                                d="M229.66,218.34l-50.07-50.06a88.11,88.11,0,1,0-11.31,11.31l50.06,50.07a8,8,0,0,0,11.32-11.32ZM40,112a72,72,0,1,1,72,72A72.08,72.08,0,0,1,40,112Z"
-                                            ></path>
-                                        </svg>
-                                    </div>
-                                    <input
-                                        placeholder="Search by name, assessment date, or risk level"
-                                        class="form-input flex w-full min-w-0 flex-1 resize-none overflow-hidden rounded-xl text-[#121516] focus:outline-0 focus:ring-0 border-none bg-[#f1f2f4] focus:border-none h-full placeholder:text-[#6a7781] px-4 rounded-l-none border-l-0 pl-2 text-base font-normal leading-normal"
-                                        value=""
-                                    />
-                                </div>
-                            </label>
-                        </div>
-                        <div class="px-4 py-3 @container">
-                            <div class="flex overflow-hidden rounded-xl border border-[#dde1e3] bg-white">
-                                <table class="flex-1">
-                                    <thead>
-                                        <tr class="bg-white">
-                                            <th class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120 px-4 py-3 text-left text-[#121516] w-[400px] text-sm font-medium leading-normal">
-                                                Patient Name
-                                            </th>
-                                            <th class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240 px-4 py-3 text-left text-[#121516] w-[400px] text-sm font-medium leading-normal">Age</th>
-                                            <th class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360 px-4 py-3 text-left text-[#121516] w-[400px] text-sm font-medium leading-normal">
-                                                Predicted Risk Score
-                                            </th>
-                                            <th class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480 px-4 py-3 text-left text-[#121516] w-[400px] text-sm font-medium leading-normal">
-                                                Medical History Summary
-                                            </th>
-                                            <th class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600 px-4 py-3 text-left text-[#121516] w-60 text-[#6a7781] text-sm font-medium leading-normal">
-                                                Actions
-                                            </th>
-                                        </tr>
-                                    </thead>
-                                    <tbody>
-                                        <tr class="border-t border-t-[#dde1e3]">
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120 h-[72px] px-4 py-2 w-[400px] text-[#121516] text-sm font-normal leading-normal">
-                                                Sophia Carter
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">62</td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                High (85%)
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                Hypertension, Atrial Fibrillation
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600 h-[72px] px-4 py-2 w-60 text-[#6a7781] text-sm font-bold leading-normal tracking-[0.015em]">
-                                                <a href="pages/09_Client_Profile.py" class="text-[#3f8abf] hover:underline">View Full Profile</a>
-                                            </td>
-                                        </tr>
-                                        <tr class="border-t border-t-[#dde1e3]">
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120 h-[72px] px-4 py-2 w-[400px] text-[#121516] text-sm font-normal leading-normal">
-                                                Ethan Bennett
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">55</td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                Moderate (50%)
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                Diabetes, High Cholesterol
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600 h-[72px] px-4 py-2 w-60 text-[#6a7781] text-sm font-bold leading-normal tracking-[0.015em]">
-                                                <a href="pages/09_Client_Profile.py" class="text-[#3f8abf] hover:underline">View Full Profile</a>
-                                            </td>
-                                        </tr>
-                                        <tr class="border-t border-t-[#dde1e3]">
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120 h-[72px] px-4 py-2 w-[400px] text-[#121516] text-sm font-normal leading-normal">
-                                                Olivia Davis
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">70</td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                Very High (92%)
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                Previous Stroke, Hypertension
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600 h-[72px] px-4 py-2 w-60 text-[#6a7781] text-sm font-bold leading-normal tracking-[0.015em]">
-                                                <a href="pages/09_Client_Profile.py" class="text-[#3f8abf] hover:underline">View Full Profile</a>
-                                            </td>
-                                        </tr>
-                                        <tr class="border-t border-t-[#dde1e3]">
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120 h-[72px] px-4 py-2 w-[400px] text-[#121516] text-sm font-normal leading-normal">
-                                                Liam Foster
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">48</td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">
-                                                Low (15%)
-                                            </td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480 h-[72px] px-4 py-2 w-[400px] text-[#6a7781] text-sm font-normal leading-normal">None</td>
-                                            <td class="table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600 h-[72px] px-4 py-2 w-60 text-[#6a7781] text-sm font-bold leading-normal tracking-[0.015em]">
-                                                <a href="pages/09_Client_Profile.py" class="text-[#3f8abf] hover:underline">View Full Profile</a>
-                                            </td>
-                                        </tr>
-                                    </tbody>
-                                </table>
-                            </div>
-                            <style>
-                                @container(max-width:120px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-120{{display: none;}}}}
-                                @container(max-width:240px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-240{{display: none;}}}}
-                                @container(max-width:360px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-360{{display: none;}}}}
-                                @container(max-width:480px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-480{{display: none;}}}}
-                                @container(max-width:600px){{.table-8d9121e1-67a3-4ae6-8b81-745fb175b74f-column-600{{display: none;}}}}
-                            </style>
-                        </div>
-                    </div>
-                </div>
-                {footer_html_content}
-            </div>
+    embed_html(header_html_content + """
+    <div class="flex flex-wrap justify-between gap-3 p-4">
+        <div class="flex min-w-72 flex-col gap-3">
+            <p class="text-[#121516] tracking-light text-[32px] font-bold leading-tight">Patient Records Management</p>
+            <p class="text-[#6a7781] text-sm font-normal leading-normal">
+                Efficiently manage and update patient information to ensure accurate risk assessments and personalized care.
+            </p>
         </div>
-    </body>
-    </html>
-    """
-    # Use st.components.v1.html to embed the full HTML content
-    # Set height to a reasonable value and enable scrolling.
-    st.components.v1.html(full_html_content, height=1200, scrolling=True) # Adjusted height for this page
+    </div>
+    """, height=220)
+    
+    # --- Search ---
+    # The query runs when the box is submitted (Enter or focus change), not per keystroke
+    search = st.text_input("Search records", key="records_search",
+                           placeholder="Search by name, assessment date, or risk level (e.g. PT-00 2025-03 high >40%)")
+    if st.session_state.get("records_search_last") != search:
+        st.session_state.records_search_last = search
+        st.session_state.records_cursors = []
+    # Start cursor of every page before this one; the current page starts after the last
+    cursors = st.session_state.setdefault("records_cursors", [])
+    page = len(cursors)
+    
+    # --- One page of records, fetched by cursor ---
+    try:
+        records, total, exact = patient_store.search_assessments(
+            search, limit=PAGE_SIZE, after=cursors[-1] if cursors else None)
+    except Exception as e:
+        st.error(f"Patient records could not be loaded: {str(e)}")
+        return
+    has_older = len(records) == PAGE_SIZE and (not exact or (page + 1) * PAGE_SIZE < total)
+    
+    if has_older:
+        # Load the next page into the store's page cache while this one is on screen
+        get_prefetch_pool().submit(patient_store.search_assessments, search, PAGE_SIZE,
+                                   after=page_cursor(records[-1]))
+    
+    if records:
+        st.dataframe(
+            records_frame(records),
+            height=GRID_HEIGHT,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "patient_id": "Patient Name",
+                "assessed_at": st.column_config.DatetimeColumn("Assessed", format="YYYY-MM-DD HH:mm"),
+                "age": st.column_config.NumberColumn("Age", format="%d"),
+                "risk_level": "Risk Level",
+                "probability": st.column_config.ProgressColumn(
+                    "Predicted Risk Score",
+                    format="%.0f%%",
+                    min_value=0,
+                    max_value=100
+                ),
+                "history_summary": "Medical History Summary",
+                "profile": st.column_config.LinkColumn("Actions", display_text="View Full Profile")
+            }
+        )
+    elif search.strip():
+        st.info("No assessments match this search.")
+    else:
+        st.info("No assessments recorded yet. Completed assessments from Patient Data Entry appear here.")
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Newer", disabled=page == 0):
+            cursors.pop()
+            st.rerun()
+    with col3:
+        if st.button("Older ▶", disabled=not has_older):
+            cursors.append(page_cursor(records[-1]))
+            st.rerun()
+    with col2:
+        shown = page * PAGE_SIZE + len(records)
+        count = f"{total:,}" if exact else f"{max(total, shown):,}+"
+        noun = "matching assessments" if search.strip() else "assessments"
+        first = page * PAGE_SIZE + 1 if records else 0
+        st.caption(f"Showing {first:,}–{shown:,} of {count} {noun}")
+    
+    embed_html(footer_html_content, height=200)
 
 # Call the function to render the page.
 patient_records_page()
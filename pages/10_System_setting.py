@@ -1,4 +1,8 @@
 import streamlit as st
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from system_settings import get_risk_threshold
 
 def system_settings_page():
     """
@@ -7,6 +11,9 @@ def system_settings_page():
     to ensure full-width rendering within the Streamlit application and
     to eliminate unnecessary scrollbars, providing a balanced and professional look.
     """
+    # Threshold used by predict_stroke_risk to label a patient High Risk
+    risk_threshold = get_risk_threshold()
+
     # Define the header HTML content with updated links and profile image
     header_html_content = """
     <header class="flex items-center justify-between whitespace-nowrap border-b border-solid border-b-[#f1f2f4] px-10 py-3">
@@ -159,7 +166,7 @@ def system_settings_page():
                                 <p class="text-[#121516] text-base font-medium leading-normal line-clamp-1">High-Risk Alert Threshold</p>
                                 <p class="text-[#6a7781] text-sm font-normal leading-normal line-clamp-2">Adjust the risk score threshold that triggers a 'high-risk' alert.</p>
                             </div>
-                            <div class="shrink-0"><p class="text-[#121516] text-base font-normal leading-normal">15%</p></div>
+                            <div class="shrink-0"><p class="text-[#121516] text-base font-normal leading-normal">{risk_threshold:.0%}</p></div>
                         </div>
                         <h2 class="text-[#121516] text-[22px] font-bold leading-tight tracking-[-0.015em] px-4 pb-3 pt-5">Criteria Customization</h2>
                         <div class="flex items-center gap-4 bg-white px-4 min-h-[72px] py-2 justify-between">
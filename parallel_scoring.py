@@ -0,0 +1,128 @@
+"""Multi-core scoring for large cohorts
+
+Shards an input cohort across a process pool. Each worker loads the model once,
+in its initializer, through the shared registry; tasks carry only the raw
+patient rows, never the model. Shard results are merged back in the original
+row order, together with per-shard timings.
+
+    from parallel_scoring import ParallelScorer
+
+    with ParallelScorer(n_workers=8) as scorer:
+        results, timings = scorer.score(cohort_df)
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from stroke_predictor_pkl import PREDICTOR_MODEL, _as_input_frame
+from system_settings import get_risk_threshold
+
+# Native thread-pool limits applied in this worker; kept referenced for the process lifetime
+_thread_limits = None
+
+def _xgboost_estimators(model):
+    """XGBoost estimators inside a model: bare, at the end of a pipeline, or among an ensemble's members"""
+    if hasattr(model, "steps"):
+        model = model.steps[-1][1]
+    if hasattr(model, "get_booster"):
+        return [model]
+    found = []
+    for member in getattr(model, "estimators_", None) or []:
+        found += _xgboost_estimators(member)
+    return found
+
+def _init_worker(model_name, threads_per_worker):
+    """Load the model once for this worker process, then pin every native thread pool"""
+    global _thread_limits
+    # Only reaches runtimes that initialise after this point: the spawned worker already
+    # imported numpy (and its BLAS) when it unpickled this function
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads_per_worker)
+
+    import stroke_predictor_pkl
+    from model_registry import registry
+    from threadpoolctl import threadpool_limits
+
+    stroke_predictor_pkl.PREDICTOR_MODEL = model_name
+    model = registry.get_model(model_name)
+    # Limit the BLAS/OpenMP pools that are already loaded, including those the model import brought in
+    _thread_limits = threadpool_limits(limits=threads_per_worker)
+    for estimator in _xgboost_estimators(model):
+        if hasattr(estimator, "n_jobs"):
+            estimator.set_params(n_jobs=threads_per_worker)
+        estimator.get_booster().set_param({"nthread": threads_per_worker})
+
+def _score_shard(shard_index, shard, threshold):
+    """Score one shard inside a worker; returns (index, results, seconds, pid)"""
+    from stroke_predictor_pkl import predict_stroke_risk_batch
+
+    start = time.perf_counter()
+    results = predict_stroke_risk_batch(shard, threshold=threshold)
+    return shard_index, results, time.perf_counter() - start, os.getpid()
+
+class ParallelScorer:
+    """Process pool that scores cohorts with one preloaded model per worker
+
+    Keep one instance alive across calls (e.g. for every chunk of a bulk job)
+    so workers and their loaded models are reused.
+    """
+
+    def __init__(self, n_workers=None, threads_per_worker=1, model_name=PREDICTOR_MODEL):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        # spawn avoids forking a parent whose OpenMP runtime is already initialised
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, threads_per_worker)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def score(self, records, threshold=None, shard_size=None):
+        """Score a cohort across the pool; returns (results in input order, per-shard timings)
+
+        By default the cohort is split into one shard per worker; pass shard_size
+        to use smaller shards for better load balancing on very large inputs.
+        """
+        frame = _as_input_frame(records)
+        if threshold is None:
+            # Resolve once so every worker labels with the same cut
+            threshold = get_risk_threshold()
+
+        n_rows = len(frame)
+        n_shards = self.n_workers if shard_size is None else max(1, -(-n_rows // shard_size))
+        bounds = np.linspace(0, n_rows, min(n_shards, max(n_rows, 1)) + 1).astype(int)
+
+        futures = [self._executor.submit(_score_shard, i, frame.iloc[lo:hi], threshold)
+                for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:]))]
+
+        shards = [None] * len(futures)
+        timings = []
+        for future in futures:
+            shard_index, results, seconds, pid = future.result()
+            shards[shard_index] = results
+            timings.append({
+                "shard": shard_index,
+                "rows": len(results),
+                "seconds": seconds,
+                "rows_per_second": len(results) / seconds if seconds > 0 else float("inf"),
+                "pid": pid
+            })
+        return pd.concat(shards), timings
+
+def predict_stroke_risk_parallel(records, n_workers=None, threshold=None, shard_size=None):
+    """One-shot parallel scoring; starts and stops its own pool"""
+    with ParallelScorer(n_workers) as scorer:
+        return scorer.score(records, threshold=threshold, shard_size=shard_size)
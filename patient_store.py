@@ -0,0 +1,472 @@
+"""Persistent patient and assessment records (SQLite, WAL mode)
+
+Every successful assessment made for a patient ID is written here by
+predict_stroke_risk / predict_stroke_risk_batch (the Patient Data Entry page
+and the scoring service), and the Patient Records page lists and searches it. WAL lets the page read
+while an assessment is being written; each thread gets its own connection.
+Search uses an FTS5 index over patient name/ID and medical history summary,
+kept in sync by triggers, plus B-tree range indexes on date and risk score.
+
+Run `python patient_store.py` to create the database (it is also created on
+first use).
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+from prediction_cache import PredictionCache
+
+# Configuration
+current_dir = Path(__file__).parent
+DB_PATH = Path(os.environ.get("STROKERISK_DB_PATH", current_dir / "patient_records.db"))
+SCHEMA_VERSION = 2
+# Search: shortest prefix that hits the index, and how far result counts are exact
+MIN_PREFIX_LENGTH = 2
+MAX_COUNTED_RESULTS = 10000
+# Prefixes matching at most this many indexed words are searched as exact words
+MAX_PREFIX_TERMS = 8
+# Score ranges up to this many rows are scanned directly instead of through the word index
+SCORE_SCAN_ROWS = 10000
+# Time allowed for counting matches; past it the total is reported as a lower bound
+COUNT_BUDGET_MS = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    assessment_id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL REFERENCES patients(patient_id),
+    assessed_at TEXT NOT NULL,
+    age REAL NOT NULL,
+    gender TEXT NOT NULL,
+    hypertension INTEGER NOT NULL,
+    heart_disease INTEGER NOT NULL,
+    avg_glucose_level REAL NOT NULL,
+    bmi REAL NOT NULL,
+    ever_married TEXT,
+    work_type TEXT,
+    residence_type TEXT,
+    smoking_status TEXT,
+    history_summary TEXT NOT NULL,
+    probability REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    threshold REAL
+);
+-- A patient's history, newest first
+CREATE INDEX IF NOT EXISTS idx_assessments_patient ON assessments(patient_id, assessed_at DESC);
+-- The records list: newest first, assessment_id breaks ties within the same timestamp
+CREATE INDEX IF NOT EXISTS idx_assessments_date ON assessments(assessed_at DESC, assessment_id DESC);
+CREATE INDEX IF NOT EXISTS idx_assessments_risk ON assessments(risk_level, assessed_at DESC, assessment_id DESC);
+CREATE INDEX IF NOT EXISTS idx_assessments_probability ON assessments(probability);
+"""
+
+# External-content full-text index: stores only the token index, rows stay in `assessments`.
+# tokenchars '-' keeps IDs like PT-001 as one token; prefix indexes make short prefix queries cheap.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS assessments_fts USING fts5(
+    patient_id, history_summary,
+    content='assessments', content_rowid='assessment_id',
+    tokenize="unicode61 tokenchars '-'", prefix='2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS assessments_fts_vocab USING fts5vocab(assessments_fts, row);
+CREATE TRIGGER IF NOT EXISTS assessments_fts_insert AFTER INSERT ON assessments BEGIN
+    INSERT INTO assessments_fts(rowid, patient_id, history_summary)
+    VALUES (new.assessment_id, new.patient_id, new.history_summary);
+END;
+CREATE TRIGGER IF NOT EXISTS assessments_fts_delete AFTER DELETE ON assessments BEGIN
+    INSERT INTO assessments_fts(assessments_fts, rowid, patient_id, history_summary)
+    VALUES ('delete', old.assessment_id, old.patient_id, old.history_summary);
+END;
+CREATE TRIGGER IF NOT EXISTS assessments_fts_update AFTER UPDATE ON assessments BEGIN
+    INSERT INTO assessments_fts(assessments_fts, rowid, patient_id, history_summary)
+    VALUES ('delete', old.assessment_id, old.patient_id, old.history_summary);
+    INSERT INTO assessments_fts(rowid, patient_id, history_summary)
+    VALUES (new.assessment_id, new.patient_id, new.history_summary);
+END;
+"""
+
+# Columns returned by the listing queries, in display order
+LIST_COLUMNS = ["assessment_id", "patient_id", "assessed_at", "age", "probability", "risk_level",
+                "history_summary"]
+
+def history_summary(input_data):
+    """Short medical history line for the records table, e.g. 'Hypertension, Smoker'"""
+    items = []
+    if input_data.get('hypertension') == 1:
+        items.append("Hypertension")
+    if input_data.get('heart_disease') == 1:
+        items.append("Heart Disease")
+    if input_data.get('smoking_status') == 'smokes':
+        items.append("Smoker")
+    elif input_data.get('smoking_status') == 'formerly smoked':
+        items.append("Former Smoker")
+    return ", ".join(items) or "None"
+
+# --- Search Parsing ---
+_DATE_RE = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+_SCORE_RE = re.compile(r"^(>=|<=|>|<)(\d+(?:\.\d+)?)(%?)$")
+_RISK_WORDS = {'high': "High Risk", 'low': "Low Risk"}
+
+class SearchQuery:
+    """A search box string split into full-text terms and indexed range filters
+
+    'PT-00 hyper 2025-03 high >40%' means: patient ID/name or history tokens
+    starting with 'PT-00' and 'hyper', assessed in March 2025, High Risk, with a
+    predicted risk above 40%.
+    """
+
+    def __init__(self, text=""):
+        self.text = " ".join(str(text).split())
+        self.terms = []
+        self.date_prefix = None
+        self.risk_level = None
+        self.min_score = None
+        self.max_score = None
+
+        for token in self.text.split(" ") if self.text else []:
+            lowered = token.lower()
+            score = _SCORE_RE.match(lowered)
+            if _DATE_RE.match(token):
+                self.date_prefix = token
+            elif lowered in _RISK_WORDS:
+                self.risk_level = _RISK_WORDS[lowered]
+            elif lowered == "risk":
+                continue
+            elif score:
+                value = float(score.group(2)) / (100 if score.group(3) or float(score.group(2)) > 1 else 1)
+                if score.group(1).startswith(">"):
+                    self.min_score = value
+                else:
+                    self.max_score = value
+            else:
+                # Only word characters and '-' reach the FTS query, so user input can't inject syntax
+                term = re.sub(r"[^\w-]", "", token)
+                if len(term) >= MIN_PREFIX_LENGTH:
+                    self.terms.append(term)
+
+    @property
+    def is_empty(self):
+        return not (self.terms or self.date_prefix or self.risk_level or
+                    self.min_score is not None or self.max_score is not None)
+
+    def key(self):
+        return repr((self.terms, self.date_prefix, self.risk_level, self.min_score, self.max_score)).encode()
+
+@lru_cache(maxsize=256)
+def _word_prefix_patterns(terms):
+    return [re.compile(r"(?<![\w-])" + re.escape(term)) for term in terms.split(" ")]
+
+def search_words(patient_id, summary, terms):
+    """1 if every space-separated term starts a word of the patient ID or history (SQL function)
+
+    Same word rules as the full-text index (letters, digits and '-', case
+    folded), for rows that are checked directly rather than through it.
+    """
+    text = f"{patient_id} {summary}".lower()
+    return int(all(pattern.search(text) for pattern in _word_prefix_patterns(terms)))
+
+def _utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+class PatientStore:
+    """Patients and their assessment history in one SQLite file"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.has_fts = False
+        # Recent search pages; invalidated whenever a new assessment is written
+        self.search_cache = PredictionCache(maxsize=256, ttl=60)
+        # Prefix -> indexed words; new words only arrive with new patients
+        self.term_cache = PredictionCache(maxsize=1024, ttl=600)
+
+    def connect(self):
+        """This thread's connection, creating the schema on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL: durable across app crashes, one fsync per checkpoint instead of per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.create_function("search_words", 3, search_words, deterministic=True)
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._init_lock:
+            if self._initialized:
+                return
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            with conn:
+                conn.executescript(SCHEMA)
+            try:
+                with conn:
+                    conn.executescript(FTS_SCHEMA)
+                    if version < 2:
+                        # Index rows written before the full-text index existed
+                        conn.execute("INSERT INTO assessments_fts(assessments_fts) VALUES ('rebuild')")
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: search falls back to LIKE scans
+                self.has_fts = False
+            with conn:
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._initialized = True
+
+    def record_assessment(self, patient_id, input_data, result):
+        """Store one successful predict_stroke_risk result; returns the new assessment_id"""
+        return self.record_assessments([(patient_id, input_data, result)])[0]
+
+    def record_assessments(self, assessments):
+        """Store (patient_id, input_data, result) triples in one transaction; returns their assessment_ids
+
+        Assessments are stamped with the current time, never earlier than the
+        newest stored one, so assessment IDs and assessed_at always sort the
+        same way (search relies on this; see _id_range).
+        """
+        assessments = [(str(patient_id).strip(), input_data, result)
+                       for patient_id, input_data, result in assessments]
+        if not all(patient_id for patient_id, _, _ in assessments):
+            raise ValueError("A patient ID is required to save an assessment")
+
+        conn = self.connect()
+        assessment_ids = []
+        with conn:
+            # Take the write lock first so no other writer can stamp between the read and the inserts
+            conn.execute("BEGIN IMMEDIATE")
+            latest = conn.execute("SELECT MAX(assessed_at) FROM assessments").fetchone()[0]
+            assessed_at = max(_utc_now(), latest or "")
+            for patient_id, input_data, result in assessments:
+                conn.execute(
+                    "INSERT INTO patients (patient_id, created_at, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(patient_id) DO UPDATE SET updated_at = excluded.updated_at",
+                    (patient_id, assessed_at, assessed_at))
+                cursor = conn.execute(
+                    "INSERT INTO assessments (patient_id, assessed_at, age, gender, hypertension, heart_disease, "
+                    "avg_glucose_level, bmi, ever_married, work_type, residence_type, smoking_status, "
+                    "history_summary, probability, risk_level, threshold) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (patient_id, assessed_at, float(input_data['age']), input_data['gender'],
+                    int(input_data['hypertension']), int(input_data['heart_disease']),
+                    float(input_data['avg_glucose_level']), float(input_data['bmi']),
+                    input_data.get('ever_married'), input_data.get('work_type'),
+                    input_data.get('Residence_type'), input_data.get('smoking_status'),
+                    history_summary(input_data), float(result['probability_raw']), result['risk_level'],
+                    result.get('threshold')))
+                assessment_ids.append(cursor.lastrowid)
+        return assessment_ids
+
+    def list_assessments(self, limit=50, offset=0, risk_level=None):
+        """One page of assessments, newest first (optionally for one risk level)"""
+        where, params = ("WHERE risk_level = ?", [risk_level]) if risk_level else ("", [])
+        rows = self.connect().execute(
+            f"SELECT {', '.join(LIST_COLUMNS)} FROM assessments {where} "
+            "ORDER BY assessed_at DESC, assessment_id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_assessments(self, risk_level=None):
+        where, params = ("WHERE risk_level = ?", [risk_level]) if risk_level else ("", [])
+        return self.connect().execute(f"SELECT COUNT(*) FROM assessments {where}", params).fetchone()[0]
+
+    def _last_assessment_id(self):
+        """Cheap change marker for the search and prefix caches (primary-key max)"""
+        return self.connect().execute("SELECT MAX(assessment_id) FROM assessments").fetchone()[0]
+
+    def _expand_prefix(self, term):
+        """FTS5 expression for one search term typed as a prefix
+
+        FTS5 answers a `"term"*` query by merging the full posting lists of every
+        word with that prefix before it can return the first row. When the
+        prefix names only a few indexed words, they are OR-ed as exact words
+        instead, which FTS5 reads lazily in rowid order and stops at the page.
+        """
+        conn = self.connect()
+        # Every new assessment can add words to the index, so expansions go stale with the search cache
+        fingerprint = self._last_assessment_id()
+        cached = self.term_cache.get(term.lower(), fingerprint)
+        if cached is not None:
+            return cached
+
+        words = [row[0] for row in conn.execute(
+            "SELECT term FROM assessments_fts_vocab WHERE term >= ? AND term < ? LIMIT ?",
+            (term.lower(), term.lower() + "\uffff", MAX_PREFIX_TERMS + 1))]
+        if words and len(words) <= MAX_PREFIX_TERMS:
+            expression = "(" + " OR ".join(f'"{word}"' for word in words) + ")"
+        else:
+            expression = f'"{term}"*'
+        self.term_cache.put(term.lower(), expression, fingerprint)
+        return expression
+
+    def _id_range(self, date_prefix):
+        """First and last assessment_id inside a date prefix, by two probes of the date index
+
+        record_assessment stamps assessed_at itself and never lets it go
+        backwards, so IDs increase with it and every row of the date range lies
+        between these two IDs.
+        """
+        conn = self.connect()
+        low = conn.execute("SELECT assessment_id FROM assessments WHERE assessed_at >= ? "
+                           "ORDER BY assessed_at, assessment_id LIMIT 1", (date_prefix,)).fetchone()
+        high = conn.execute("SELECT assessment_id FROM assessments WHERE assessed_at < ? "
+                            "ORDER BY assessed_at DESC, assessment_id DESC LIMIT 1",
+                            (date_prefix + "\uffff",)).fetchone()
+        return (low[0] if low else 0), (high[0] if high else -1)
+
+    def search_assessments(self, text, limit=50, offset=0, after=None):
+        """One page of assessments matching a search box string; returns (rows, total, total_is_exact)
+
+        Full-text terms are matched as prefixes through the FTS5 index, newest
+        assessment first; date, risk level and score filters use their range
+        indexes. Totals are exact up to MAX_COUNTED_RESULTS, or a lower bound
+        if counting exceeds COUNT_BUDGET_MS.
+
+        `after` is a cursor: the last row of the previous page (any dict with
+        its assessed_at and assessment_id). The page then starts right after
+        that row through the sort index, so deep pages cost the same as the
+        first one; `offset` is still honoured but has to skip rows.
+        """
+        query = SearchQuery(text)
+        cursor = (after['assessed_at'], after['assessment_id']) if after else None
+        cache_key = query.key() + f"|{limit}|{offset}|{cursor}".encode()
+        fingerprint = self._last_assessment_id()
+        cached = self.search_cache.get(cache_key, fingerprint)
+        if cached is not None:
+            return cached
+
+        clauses, params = [], []
+        if query.date_prefix:
+            # ISO timestamps sort as text, so a date prefix is an index range
+            clauses.append("a.assessed_at >= ? AND a.assessed_at < ?")
+            params += [query.date_prefix, query.date_prefix + "\uffff"]
+        if query.risk_level:
+            clauses.append("a.risk_level = ?")
+            params.append(query.risk_level)
+        if query.min_score is not None:
+            clauses.append("a.probability >= ?")
+            params.append(query.min_score)
+        if query.max_score is not None:
+            clauses.append("a.probability <= ?")
+            params.append(query.max_score)
+
+        columns = ", ".join(f"a.{column}" for column in LIST_COLUMNS)
+        if query.terms and self.has_fts and not self._score_range_is_small(query):
+            # Drive from the full-text index; rowid order is (assessed_at, assessment_id) order,
+            # since record_assessment keeps timestamps monotonic, so results sort as the listing does
+            source = "assessments_fts f JOIN assessments a ON a.assessment_id = f.rowid"
+            match = " AND ".join(self._expand_prefix(term) for term in query.terms)
+            if query.date_prefix:
+                # Let the full-text index skip straight to the date range's IDs
+                clauses.insert(0, "f.rowid BETWEEN ? AND ?")
+                params[:0] = self._id_range(query.date_prefix)
+            clauses.insert(0, "assessments_fts MATCH ?")
+            params.insert(0, match)
+            order = "f.rowid DESC"
+            seek, seek_params = "f.rowid < ?", [cursor[1]] if cursor else []
+            # Without row filters the matches can be counted from the index alone
+            count_source = source if len(clauses) > 1 else "assessments_fts f"
+        else:
+            source = "assessments a"
+            if query.terms:
+                # A small score range (or no FTS5): check the words on each candidate row
+                if query.min_score is not None or query.max_score is not None:
+                    source = "assessments a INDEXED BY idx_assessments_probability"
+                # LIKE is a cheap substring pre-check; search_words then applies the word rules
+                for term in query.terms:
+                    clauses.append("(a.patient_id LIKE ? OR a.history_summary LIKE ?)")
+                    params += [f"%{term}%", f"%{term}%"]
+                clauses.append("search_words(a.patient_id, a.history_summary, ?)")
+                params.append(" ".join(term.lower() for term in query.terms))
+            order = "a.assessed_at DESC, a.assessment_id DESC"
+            seek, seek_params = "(a.assessed_at, a.assessment_id) < (?, ?)", list(cursor or [])
+            count_source = source
+        where = " AND ".join(clauses) or "1"
+
+        conn = self.connect()
+        if source.endswith("INDEXED BY idx_assessments_probability"):
+            # At most SCORE_SCAN_ROWS candidates: match them once, then count and page in memory
+            matches = conn.execute(
+                f"SELECT a.assessed_at, a.assessment_id FROM {source} WHERE {where} ORDER BY {order}",
+                params).fetchall()
+            start = offset
+            if cursor:
+                start += next((i for i, key in enumerate(matches) if tuple(key) < cursor), len(matches))
+            page_ids = [key[1] for key in matches[start:start + limit]]
+            by_id = {row["assessment_id"]: dict(row) for row in conn.execute(
+                f"SELECT {', '.join(LIST_COLUMNS)} FROM assessments "
+                f"WHERE assessment_id IN ({', '.join('?' * len(page_ids))})", page_ids)}
+            rows, total = [by_id[assessment_id] for assessment_id in page_ids], len(matches)
+        else:
+            page_where = f"{where} AND {seek}" if cursor else where
+            rows = [dict(row) for row in conn.execute(
+                f"SELECT {columns} FROM {source} WHERE {page_where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + (seek_params if cursor else []) + [limit, offset])]
+            if query.is_empty:
+                total = self.count_assessments()
+            else:
+                total = self._count_within_budget(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM {count_source} WHERE {where} LIMIT ?)",
+                    params + [MAX_COUNTED_RESULTS + 1])
+        if query.is_empty:
+            result = (rows, total, True)
+        elif total is None:
+            # Counting ran out of time: all we know is that this page's rows match
+            result = (rows, (0 if cursor else offset) + len(rows), False)
+        else:
+            result = (rows, min(total, MAX_COUNTED_RESULTS), total <= MAX_COUNTED_RESULTS)
+        self.search_cache.put(cache_key, result, fingerprint)
+        return result
+
+    def _score_range_is_small(self, query):
+        """True if the score filter alone narrows the search to at most SCORE_SCAN_ROWS rows"""
+        if query.min_score is None and query.max_score is None:
+            return False
+        low = query.min_score if query.min_score is not None else 0.0
+        high = query.max_score if query.max_score is not None else 1.0
+        rows = self.connect().execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM assessments WHERE probability BETWEEN ? AND ? LIMIT ?)",
+            (low, high, SCORE_SCAN_ROWS + 1)).fetchone()[0]
+        return rows <= SCORE_SCAN_ROWS
+
+    def _count_within_budget(self, sql, params):
+        """Run a COUNT query, or return None if it takes longer than COUNT_BUDGET_MS"""
+        conn = self.connect()
+        deadline = time.perf_counter() + COUNT_BUDGET_MS / 1000
+        conn.set_progress_handler(lambda: int(time.perf_counter() > deadline), 10000)
+        try:
+            return conn.execute(sql, params).fetchone()[0]
+        except sqlite3.OperationalError as e:
+            if "interrupt" not in str(e):
+                raise
+            return None
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def patient_history(self, patient_id, limit=100):
+        """A patient's assessments, newest first"""
+        rows = self.connect().execute(
+            "SELECT * FROM assessments WHERE patient_id = ? ORDER BY assessed_at DESC LIMIT ?",
+            (patient_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+# Shared instance used by the assessment and records pages
+patient_store = PatientStore()
+
+if __name__ == "__main__":
+    patient_store.connect()
+    print(f"Patient store ready at {patient_store.path} "
+        f"({patient_store.count_assessments():,} assessments)")
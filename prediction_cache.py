@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+class PredictionCache:
+    """Bounded, thread-safe LRU memo of model outputs with a time-to-live
+
+    Keys are canonical byte strings (the encoded float32 feature row), so two
+    form submissions that encode identically share one entry. Every lookup
+    carries the fingerprint of the model that would answer it; when that
+    fingerprint changes the whole cache is dropped, so a retrained or
+    re-exported artifact never serves stale scores.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600.0, clock=time.monotonic):
+        if maxsize < 0:
+            raise ValueError("maxsize must be >= 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_fingerprint(self, fingerprint):
+        """Drop everything if the model behind the cache changed; lock must be held"""
+        if fingerprint != self._fingerprint:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, key, fingerprint=None):
+        """Cached value for `key`, or None on a miss or an expired entry"""
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if self.ttl is None or self._clock() < expires_at:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, fingerprint=None):
+        """Store `value`, evicting the least recently used entries beyond maxsize"""
+        if self.maxsize == 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        """Snapshot of size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
@@ -0,0 +1,105 @@
+"""Headless HTTP scoring service for stroke risk
+
+An ASGI app exposing the same scoring path as the Streamlit form, for EHR
+integrations that need to call the model directly:
+
+    GET  /health          model name, artifact hash and prediction cache stats
+    POST /predict         one patient dict  -> predict_stroke_risk result
+    POST /predict/batch   {"patients": [...]} -> one result per patient, in order
+    POST /explain         one patient dict  -> explain_stroke_risk per-field contributions
+
+The model is loaded once at startup and shared by a pool of scoring threads
+(XGBoost and the tree ensembles release the GIL while predicting). A patient
+dict that carries a "patient_id" is also saved to the patient records store,
+like an assessment from the Patient Data Entry page.
+
+Run with:
+    uvicorn scoring_service:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import Body, FastAPI, HTTPException, Request
+
+from model_registry import registry
+from stroke_predictor_pkl import (PREDICTOR_MODEL, explain_stroke_risk, predict_stroke_risk,
+                                predict_stroke_risk_batch, prediction_cache, validate_input)
+
+# Configuration
+SCORING_WORKERS = int(os.environ.get("STROKERISK_SCORING_WORKERS", os.cpu_count() or 4))
+MAX_BATCH_SIZE = int(os.environ.get("STROKERISK_MAX_BATCH_SIZE", 10000))
+
+@asynccontextmanager
+async def lifespan(app):
+    # A fresh pool per startup: the one from a previous lifespan has been shut down
+    app.state.scoring_pool = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+    try:
+        # Load the model before accepting traffic so the first request doesn't pay for it
+        await asyncio.get_running_loop().run_in_executor(app.state.scoring_pool, registry.get, PREDICTOR_MODEL)
+        yield
+    finally:
+        app.state.scoring_pool.shutdown(wait=True)
+
+app = FastAPI(title="StrokeRisk Scoring Service", lifespan=lifespan)
+
+async def _run(request, fn, *args):
+    """Run a blocking scoring call on the app's scoring pool"""
+    return await asyncio.get_running_loop().run_in_executor(request.app.state.scoring_pool, fn, *args)
+
+@app.get("/health")
+async def health():
+    entry = registry.get(PREDICTOR_MODEL)
+    return {
+        "status": "ok",
+        "model": PREDICTOR_MODEL,
+        "format": entry.artifact_format,
+        "artifact_hash": entry.artifact_hash,
+        "workers": SCORING_WORKERS,
+        "cache": prediction_cache.stats()
+    }
+
+@app.post("/predict")
+async def predict(request: Request, patient: dict = Body(...)):
+    try:
+        validate_input(patient)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    result = await _run(request, predict_stroke_risk, patient, None, patient.get("patient_id"))
+    if result.get("status") != "success":
+        raise HTTPException(status_code=500, detail=result.get("error", "Prediction failed"))
+    return result
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request, payload: dict = Body(...)):
+    patients = payload.get("patients")
+    if not isinstance(patients, list):
+        raise HTTPException(status_code=422, detail="Body must be {\"patients\": [...]}")
+    if len(patients) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE} patients")
+    if not patients:
+        return {"results": []}
+    for i, patient in enumerate(patients):
+        if not isinstance(patient, dict):
+            raise HTTPException(status_code=422, detail=f"patients[{i}] must be a JSON object")
+
+    patient_ids = [patient.get("patient_id") for patient in patients]
+    results = await _run(request, predict_stroke_risk_batch, patients, None,
+                        patient_ids if any(patient_ids) else None)
+    # to_json turns missing predictions (invalid rows) into null and NumPy scalars into plain JSON
+    return {"results": json.loads(results.to_json(orient="records"))}
+
+@app.post("/explain")
+async def explain(request: Request, patient: dict = Body(...)):
+    try:
+        validate_input(patient)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    result = await _run(request, explain_stroke_risk, patient)
+    if result.get("status") != "success":
+        raise HTTPException(status_code=500, detail=result.get("error", "Explanation failed"))
+    return result
@@ -1,80 +1,64 @@
 import pandas as pd
 import numpy as np
-import joblib
 from pathlib import Path
-import matplotlib.pyplot as plt
-from io import BytesIO
-import seaborn as sns
-from sklearn.metrics import roc_curve, auc, confusion_matrix
 import os
+from system_settings import get_risk_threshold
+from model_registry import registry, predict_contributions
+from prediction_cache import PredictionCache
+from feature_pipeline import MODEL_COLUMNS, as_input_frame, feature_pipeline
 
 # Configuration - UPDATED PATH HANDLING
 current_dir = Path(__file__).parent
-MODEL_PATH = current_dir / "strokerisk_tune_ensemble_model.pkl"
+
+# Model behind the clinical predictor; a native export of it (if any) only makes loading faster
+PREDICTOR_MODEL = os.environ.get("STROKERISK_PREDICTOR_MODEL", "Ensemble")
+MODEL_PATH = registry.path_for(PREDICTOR_MODEL)
 DATA_SAMPLE_PATH = current_dir / "data" / "sample_data.csv"
 
-# Robust model loading with error handling
-try:
-    # Verify model file exists
-    if not MODEL_PATH.exists():
-        raise FileNotFoundError(f"Model file not found at {MODEL_PATH}")
-    
-    # Load model data
-    model_data = joblib.load(MODEL_PATH)
-    
-    # Handle different model saving formats
-    if isinstance(model_data, dict):
-        # Case 1: Model saved as dictionary with keys
-        model = model_data.get("model")
-        feature_columns = model_data.get("feature_columns", [])
-        
-        # Fallback if 'model' key doesn't exist
-        if model is None:
-            for value in model_data.values():
-                if hasattr(value, 'predict'):
-                    model = value
-                    break
-    else:
-        # Case 2: Model saved directly
-        model = model_data
-        feature_columns = []
-    
-    # Validate loaded model
-    if not hasattr(model, 'predict'):
-        raise ValueError("Loaded object is not a valid scikit-learn model")
-    
-    # Define feature columns if not loaded
-    if not feature_columns:
-        feature_columns = [
-            'age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi',
-            'gender_Female', 'gender_Male', 'gender_Other',
-            'ever_married_No', 'ever_married_Yes',
-            'work_type_Govt_job', 'work_type_Never_worked',
-            'work_type_Private', 'work_type_Self-employed', 'work_type_children',
-            'Residence_type_Rural', 'Residence_type_Urban',
-            'smoking_status_Unknown', 'smoking_status_formerly smoked',
-            'smoking_status_never smoked', 'smoking_status_smokes'
-        ]
+# Memo of single-patient probabilities keyed on the encoded feature row
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("STROKERISK_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("STROKERISK_CACHE_TTL", 600))
+)
+
+def get_model():
+    """Predictor model from the shared registry (loaded on first call)"""
+    return registry.get_model(PREDICTOR_MODEL)
 
-except Exception as e:
-    raise RuntimeError(f"Failed to load model: {str(e)}")
+def get_feature_columns():
+    """Feature names saved with the model, falling back to the training column order"""
+    return registry.get(PREDICTOR_MODEL).feature_columns or MODEL_COLUMNS
 
-# Training data stats
-age_mean, age_std = 43.23, 22.61
-glucose_mean, glucose_std = 106.15, 45.28
-bmi_mean, bmi_std = 28.89, 7.85
+# Training data stats (owned by the shared feature pipeline)
+(age_mean, age_std) = feature_pipeline.scaling['age']
+(glucose_mean, glucose_std) = feature_pipeline.scaling['avg_glucose_level']
+(bmi_mean, bmi_std) = feature_pipeline.scaling['bmi']
 target_names = ["Low Risk", "High Risk"]
 
+REQUIRED_FIELDS = ['age', 'hypertension', 'heart_disease',
+                'avg_glucose_level', 'bmi', 'gender']
+VALID_GENDERS = ['Male', 'Female', 'Other']
+# Numeric fields and their names in validation messages
+NUMERIC_FIELDS = {'age': "Age", 'bmi': "BMI", 'avg_glucose_level': "Glucose level",
+                'hypertension': "Hypertension", 'heart_disease': "Heart disease"}
+
 def validate_input(input_data):
     """Validate input data before processing"""
     errors = []
     
     # Check required fields
-    required_fields = ['age', 'hypertension', 'heart_disease', 
-                    'avg_glucose_level', 'bmi', 'gender']
-    for field in required_fields:
+    for field in REQUIRED_FIELDS:
         if field not in input_data:
             errors.append(f"Missing required field: {field}")
+    errors += field_errors(input_data)
+    
+    if errors:
+        raise ValueError(" | ".join(errors))
+    return True
+
+def field_errors(input_data):
+    """Range/category errors for whichever fields are present (no required-field check)"""
+    errors = []
     
     # Validate numerical ranges
     if 'age' in input_data and not (0 <= input_data['age'] <= 120):
@@ -85,129 +69,87 @@ def validate_input(input_data):
         errors.append("Glucose level must be between 50-300 mg/dL")
     
     # Validate categorical values
-    valid_genders = ['Male', 'Female', 'Other']
-    if 'gender' in input_data and input_data['gender'] not in valid_genders:
-        errors.append(f"Gender must be one of: {', '.join(valid_genders)}")
-    
-    if errors:
-        raise ValueError(" | ".join(errors))
-    return True
+    if 'gender' in input_data and input_data['gender'] not in VALID_GENDERS:
+        errors.append(f"Gender must be one of: {', '.join(VALID_GENDERS)}")
+    return errors
 
 def preprocess_input(input_data):
     """Convert frontend input to model-ready format with proper feature encoding"""
-    # Initialize all features with 0 (using your actual feature names)
-    processed = {
-        'age': 0,
-        'hypertension': 0,
-        'heart_disease': 0,
-        'avg_glucose_level': 0,
-        'bmi': 0,
-        'gender_Male': 0,
-        'gender_Other': 0,
-        'ever_married_Yes': 0,
-        'work_type_Never_worked': 0,
-        'work_type_Private': 0,
-        'work_type_Self-employed': 0,
-        'work_type_children': 0,
-        'Residence_type_Urban': 0,
-        'smoking_status_formerly smoked': 0,
-        'smoking_status_never smoked': 0,
-        'smoking_status_smokes': 0,
-        'age_group_19-30': 0,
-        'age_group_31-45': 0,
-        'age_group_46-60': 0,
-        'age_group_61-75': 0,
-        'age_group_76+': 0
-    }
-    
-    # Handle numerical features (standardized values)
-    if 'age' in input_data:
-        processed['age'] = (input_data['age'] - age_mean) / age_std
-    if 'avg_glucose_level' in input_data:
-        processed['avg_glucose_level'] = (input_data['avg_glucose_level'] - glucose_mean) / glucose_std
-    if 'bmi' in input_data:
-        processed['bmi'] = (input_data['bmi'] - bmi_mean) / bmi_std
-    
-    # Binary features
-    processed['hypertension'] = 1 if input_data.get('hypertension', 0) == 1 else 0
-    processed['heart_disease'] = 1 if input_data.get('heart_disease', 0) == 1 else 0
-    
-    # Handle categorical features (one-hot encoding)
-    gender = input_data.get('gender', 'Female')
-    if gender == 'Male':
-        processed['gender_Male'] = 1
-    elif gender == 'Other':
-        processed['gender_Other'] = 1
-    
-    if input_data.get('ever_married', 'No') == 'Yes':
-        processed['ever_married_Yes'] = 1
-    
-    work_type = input_data.get('work_type', 'Private')
-    if work_type == 'Never_worked':
-        processed['work_type_Never_worked'] = 1
-    elif work_type == 'Private':
-        processed['work_type_Private'] = 1
-    elif work_type == 'Self-employed':
-        processed['work_type_Self-employed'] = 1
-    elif work_type == 'children':
-        processed['work_type_children'] = 1
-    
-    if input_data.get('Residence_type', 'Urban') == 'Urban':
-        processed['Residence_type_Urban'] = 1
-    
-    smoking_status = input_data.get('smoking_status', 'never smoked')
-    if smoking_status == 'formerly smoked':
-        processed['smoking_status_formerly smoked'] = 1
-    elif smoking_status == 'never smoked':
-        processed['smoking_status_never smoked'] = 1
-    elif smoking_status == 'smokes':
-        processed['smoking_status_smokes'] = 1
+    return dict(zip(MODEL_COLUMNS, feature_pipeline.transform_one(input_data).tolist()))
+
+def score_probabilities(df, threshold=None):
+    """Run the model once and derive labels from the High Risk probability
     
-    # Handle age groups (mutually exclusive)
-    age = input_data.get('age', 0)
-    if age <= 30:
-        processed['age_group_19-30'] = 1
-    elif age <= 45:
-        processed['age_group_31-45'] = 1
-    elif age <= 60:
-        processed['age_group_46-60'] = 1
-    elif age <= 75:
-        processed['age_group_61-75'] = 1
-    else:
-        processed['age_group_76+'] = 1
+    Returns (predictions, probabilities, threshold). The label cut comes from the
+    configured High-Risk Alert Threshold rather than the model's implicit 0.5.
+    """
+    if threshold is None:
+        threshold = get_risk_threshold()
+    probabilities = get_model().predict_proba(df)
+    predictions = (probabilities[:, 1] >= threshold).astype(int)
+    return predictions, probabilities, threshold
+
+def predict_proba_cached(row):
+    """Probabilities for one encoded row, served from prediction_cache when possible
     
-    return processed
+    The encoded float32 row is the cache key, so equivalent form inputs share an
+    entry; the cache empties itself when the model artifact's hash changes.
+    """
+    entry = registry.get(PREDICTOR_MODEL, reload_if_changed=True)
+    key = row.tobytes()
+    probabilities = prediction_cache.get(key, entry.artifact_hash)
+    if probabilities is None:
+        probabilities = entry.model.predict_proba(feature_pipeline.to_frame(row))[0]
+        probabilities.flags.writeable = False
+        prediction_cache.put(key, probabilities, entry.artifact_hash)
+    return probabilities
+
+def _record_assessments(patient_ids, records, results):
+    """Save successful results to the patient records store; returns (assessment_ids, error or None)
+
+    A storage failure is reported rather than raised, so the prediction itself
+    still reaches the caller.
+    """
+    from patient_store import patient_store
 
-def predict_stroke_risk(input_data):
-    """Final working prediction function"""
+    try:
+        return patient_store.record_assessments(zip(patient_ids, records, results)), None
+    except Exception as e:
+        return None, f"Assessment could not be saved to patient records: {str(e)}"
+
+def predict_stroke_risk(input_data, threshold=None, patient_id=None):
+    """Final working prediction function
+    
+    With a patient_id, a successful assessment is also saved to the patient
+    records store ('assessment_id' in the result, or 'record_error').
+    """
     try:
         validate_input(input_data)
-        processed_data = preprocess_input(input_data)
-        
-        # Create dataframe with EXACTLY the right columns in right order
-        df = pd.DataFrame([processed_data], columns=[
-            'age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi',
-            'gender_Male', 'gender_Other', 'ever_married_Yes',
-            'work_type_Never_worked', 'work_type_Private',
-            'work_type_Self-employed', 'work_type_children',
-            'Residence_type_Urban', 'smoking_status_formerly smoked',
-            'smoking_status_never smoked', 'smoking_status_smokes',
-            'age_group_19-30', 'age_group_31-45', 'age_group_46-60',
-            'age_group_61-75', 'age_group_76+'
-        ])
+        # Encode straight into a float32 row in the model's column order
+        row = feature_pipeline.transform_one(input_data)
         
-        # Get prediction
-        prediction = model.predict(df)[0]
-        probabilities = model.predict_proba(df)[0]
+        # Single (memoized) model pass: label and risk level both come from the probabilities
+        probabilities = predict_proba_cached(row)
+        if threshold is None:
+            threshold = get_risk_threshold()
+        prediction = int(probabilities[1] >= threshold)
         
-        return {
+        result = {
             "status": "success",
             "prediction": int(prediction),
             "probabilities": probabilities.tolist(),
             "risk_level": "High Risk" if prediction == 1 else "Low Risk",
             "probability_percent": f"{probabilities[1]*100:.1f}%",
-            "probability_raw": float(probabilities[1])
+            "probability_raw": float(probabilities[1]),
+            "threshold": threshold
         }
+        if patient_id is not None and str(patient_id).strip():
+            assessment_ids, record_error = _record_assessments([patient_id], [input_data], [result])
+            if record_error:
+                result["record_error"] = record_error
+            else:
+                result["assessment_id"] = assessment_ids[0]
+        return result
     except Exception as e:
         return {
             "status": "error",
@@ -218,36 +160,216 @@ def predict_stroke_risk(input_data):
             "probability_raw": 0.0
         }
 
-def get_feature_importance(top_n=10):
-    """Get feature importance from model"""
-    if not hasattr(model, 'feature_importances_'):
-        raise AttributeError("Model doesn't support feature importance")
+# --- Batch Scoring ---
+def _as_input_frame(records):
+    """Normalize a list of dicts, DataFrame or NumPy structured array into a raw input frame"""
+    return as_input_frame(records, feature_pipeline.input_fields)
+
+def validate_batch(frame):
+    """Vectorized validate_input; returns one error string per row ('' when valid)"""
+    n_rows = len(frame)
+    numeric = {field: pd.to_numeric(frame[field], errors='coerce').to_numpy(dtype=float)
+            for field in NUMERIC_FIELDS}
+    age, bmi, glucose = numeric['age'], numeric['bmi'], numeric['avg_glucose_level']
+    gender = frame['gender']
     
-    importance = model.feature_importances_
-    indices = np.argsort(importance)[-top_n:][::-1]
+    checks = [(frame[field].isna().to_numpy(), f"Missing required field: {field}")
+            for field in REQUIRED_FIELDS]
+    # Present but not a number (e.g. "unknown" or "" from a CSV): coercion would score it as NaN
+    checks += [(frame[field].notna().to_numpy() & np.isnan(values), f"{NUMERIC_FIELDS[field]} must be numeric")
+            for field, values in numeric.items()]
+    checks += [
+        (~np.isnan(age) & ~((age >= 0) & (age <= 120)), "Age must be between 0-120"),
+        (~np.isnan(bmi) & ~((bmi >= 10) & (bmi <= 50)), "BMI must be between 10-50"),
+        (~np.isnan(glucose) & ~((glucose >= 50) & (glucose <= 300)),
+            "Glucose level must be between 50-300 mg/dL"),
+        ((gender.notna() & ~gender.isin(VALID_GENDERS)).to_numpy(),
+            f"Gender must be one of: {', '.join(VALID_GENDERS)}")
+    ]
     
-    return pd.DataFrame({
-        'Feature': [feature_columns[i] for i in indices],
-        'Importance': importance[indices]
-    })
+    errors = np.full(n_rows, '', dtype=object)
+    for mask, message in checks:
+        if mask.any():
+            current = errors[mask]
+            errors[mask] = np.where(current == '', message, current + " | " + message)
+    return errors
 
-def generate_what_if_scenario(base_data, changes):
-    """Run what-if analysis with modified features"""
+def predict_stroke_risk_batch(records, threshold=None, patient_ids=None):
+    """Score many patients with one vectorized encode and a single predict_proba call
+    
+    Accepts a list of dicts, a DataFrame or a NumPy structured array with the same
+    fields as predict_stroke_risk. Returns a DataFrame with one row per input row,
+    in input order; rows that fail validation get status 'error' and are not scored.
+    Labels use the configured High-Risk Alert Threshold unless `threshold` is given.
+    
+    patient_ids (one per row, None or blank to skip a row) saves the successful
+    rows to the patient records store in one transaction; a storage failure
+    fills the 'record_error' column instead of failing the batch.
+    """
+    frame = _as_input_frame(records)
+    errors = validate_batch(frame)
+    valid = errors == ''
+    
+    n_rows = len(frame)
+    probability_raw = np.zeros(n_rows, dtype=float)
+    prediction = pd.array([pd.NA] * n_rows, dtype="Int64")
+    
+    if valid.any():
+        valid_frame = frame.loc[valid]
+        df = feature_pipeline.transform_frame(valid_frame)
+        predictions, probabilities, threshold = score_probabilities(df, threshold)
+        probability_raw[valid] = probabilities[:, 1]
+        prediction[valid] = predictions
+    
+    high_risk = prediction.fillna(0).to_numpy(dtype=int) == 1
+    risk_level = np.where(valid, np.where(high_risk, "High Risk", "Low Risk"), "Error")
+    results = pd.DataFrame({
+        "status": np.where(valid, "success", "error"),
+        "prediction": prediction,
+        "risk_level": risk_level,
+        "probability_raw": probability_raw,
+        "probability_percent": [f"{p*100:.1f}%" for p in probability_raw],
+        "error": errors
+    }, index=frame.index)
+    
+    if patient_ids is not None:
+        patient_ids = pd.Series(list(patient_ids), index=frame.index, dtype=object)
+        save = valid & (patient_ids.fillna('').astype(str).str.strip() != '').to_numpy()
+        record_error = None
+        if save.any():
+            # Stored as numbers even when the input carried them as strings
+            inputs = frame.loc[save].assign(**{field: pd.to_numeric(frame.loc[save, field])
+                                            for field in NUMERIC_FIELDS})
+            saved = results.loc[save, ["risk_level", "probability_raw"]].assign(threshold=threshold)
+            _, record_error = _record_assessments(patient_ids[save], inputs.to_dict('records'),
+                                                saved.to_dict('records'))
+        results["record_error"] = np.where(save, record_error or '', '')
+    return results
+
+# --- Patient Attribution ---
+# Tree-path SHAP needs an XGBoost booster, so explanations come from that model
+ATTRIBUTION_MODEL = os.environ.get("STROKERISK_ATTRIBUTION_MODEL", "XGBoost")
+attribution_cache = PredictionCache(maxsize=prediction_cache.maxsize, ttl=prediction_cache.ttl)
+_field_groups = {}
+
+def _group_matrix(columns):
+    """(raw field names, 0/1 matrix summing encoded columns into their raw field)"""
+    key = tuple(columns)
+    if key not in _field_groups:
+        sources = [feature_pipeline.column_sources.get(column, column) for column in columns]
+        fields = list(dict.fromkeys(sources))
+        matrix = np.zeros((len(columns), len(fields)), dtype=np.float32)
+        matrix[np.arange(len(columns)), [fields.index(source) for source in sources]] = 1
+        _field_groups[key] = (fields, matrix)
+    return _field_groups[key]
+
+def contributions_for_rows(matrix):
+    """Per-column contributions for encoded rows; returns (contributions, column names)
+    
+    contributions is (n_rows, n_columns + 1) in log-odds with the bias last. Rows
+    already explained are served from attribution_cache; all the others go to
+    the booster in a single call.
+    """
+    entry = registry.get(ATTRIBUTION_MODEL, reload_if_changed=True)
+    columns = list(entry.feature_columns or MODEL_COLUMNS)
+    matrix = np.atleast_2d(matrix)
+    result = np.empty((len(matrix), len(columns) + 1), dtype=np.float32)
+    
+    keys = [row.tobytes() for row in matrix]
+    missing = []
+    for i, key in enumerate(keys):
+        cached = attribution_cache.get(key, entry.artifact_hash)
+        if cached is None:
+            missing.append(i)
+        else:
+            result[i] = cached
+    
+    if missing:
+        computed = predict_contributions(entry.model, feature_pipeline.to_frame(matrix[missing]))
+        for i, values in zip(missing, np.asarray(computed, dtype=np.float32)):
+            values.flags.writeable = False
+            attribution_cache.put(keys[i], values, entry.artifact_hash)
+            result[i] = values
+    return result, columns
+
+def explain_stroke_risk_batch(records):
+    """Per-patient attribution for many patients, summed back onto the raw input fields
+    
+    Returns a DataFrame in input order with one log-odds column per input field
+    (age includes its age-group bits) plus 'base_value'; positive values push
+    towards High Risk. Rows that fail validation are left as NaN.
+    """
+    frame = _as_input_frame(records)
+    valid = validate_batch(frame) == ''
+    
+    contributions, columns = contributions_for_rows(
+        feature_pipeline.transform(frame.loc[valid]) if valid.any() else feature_pipeline.allocate(0))
+    fields, groups = _group_matrix(columns)
+    
+    result = pd.DataFrame(np.nan, index=frame.index, columns=fields + ['base_value'])
+    result.loc[valid, fields] = contributions[:, :-1] @ groups
+    result.loc[valid, 'base_value'] = contributions[:, -1]
+    return result
+
+def explain_stroke_risk(input_data, top_n=None):
+    """Why this patient got their score: per-field contributions in log-odds
+    
+    Costs one cached native call on top of predict_stroke_risk. 'contributions'
+    is ordered by absolute effect, largest first.
+    """
     try:
-        modified_data = base_data.copy()
-        modified_data.update(changes)
-        
-        result = predict_stroke_risk(modified_data)
-        if result.get('status') != 'success':
-            raise ValueError(result.get('error', 'Prediction failed'))
+        validate_input(input_data)
+        row = feature_pipeline.transform_one(input_data)
+        contributions, columns = contributions_for_rows(row)
+        fields, groups = _group_matrix(columns)
+        by_field = contributions[0, :-1] @ groups
         
+        order = np.argsort(-np.abs(by_field), kind="mergesort")[:top_n]
+        margin = float(contributions[0].sum())
         return {
             "status": "success",
-            "original_risk": base_data.get('probability_raw', 0),
-            "new_risk": result['probability_raw'],
-            "risk_change": result['probability_raw'] - base_data.get('probability_raw', 0),
-            "details": result
+            "model": ATTRIBUTION_MODEL,
+            "base_value": float(contributions[0, -1]),
+            "contributions": {fields[i]: float(by_field[i]) for i in order},
+            "feature_contributions": dict(zip(columns, contributions[0, :-1].tolist())),
+            "probability_raw": float(1.0 / (1.0 + np.exp(-margin)))
         }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e),
+            "contributions": {}
+        }
+
+def get_feature_importance(top_n=10):
+    """Get feature importance from model (precomputed once at model load)"""
+    importance = registry.get_importance(PREDICTOR_MODEL)
+    if importance is None:
+        raise AttributeError("Model doesn't support feature importance")
+    
+    return importance.top(top_n)[['Feature', 'Importance']].reset_index(drop=True)
+
+# Recently used ScenarioSessions keyed by base patient, shared by all sessions and threads
+scenario_sessions = PredictionCache(maxsize=32, ttl=600)
+
+def generate_what_if_scenario(base_data, changes):
+    """Run what-if analysis with modified features
+    
+    Calls for a base patient seen recently reuse its ScenarioSession, so only
+    the changed fields are validated and re-encoded.
+    """
+    try:
+        from what_if_engine import ScenarioSession
+        
+        key = repr(sorted((field, base_data[field]) for field in feature_pipeline.input_fields
+                        if field in base_data)).encode()
+        # A reloaded model invalidates every session's base probability
+        fingerprint = registry.get(PREDICTOR_MODEL, reload_if_changed=True).artifact_hash
+        session = scenario_sessions.get(key, fingerprint)
+        if session is None:
+            session = ScenarioSession(base_data)
+            scenario_sessions.put(key, session, fingerprint)
+        return session.score(changes)
     except Exception as e:
         return {
             "status": "error",
@@ -255,45 +377,58 @@ def generate_what_if_scenario(base_data, changes):
         }
 
 def plot_model_performance():
-    """Generate performance plots using sample data"""
+    """Generate performance plots using sample data
+    
+    PNGs are cached on the model artifact and the sample file, so repeat calls
+    neither re-score the model nor re-render the figures.
+    """
+    # Plotting and metric stacks are imported here so predictor-only callers never load them
+    import seaborn as sns
+    from sklearn.metrics import roc_curve, auc, confusion_matrix
+    from chart_cache import chart_cache
+    
     try:
-        df = pd.read_csv(DATA_SAMPLE_PATH)
-        X = df.drop('stroke', axis=1)
-        y = df['stroke']
-        
-        # ROC Curve
-        y_scores = model.predict_proba(X)[:, 1]
-        fpr, tpr, _ = roc_curve(y, y_scores)
-        roc_auc = auc(fpr, tpr)
+        entry = registry.get(PREDICTOR_MODEL, reload_if_changed=True)
+        sample_stat = os.stat(DATA_SAMPLE_PATH)
+        cache_key = (entry.artifact_hash, str(DATA_SAMPLE_PATH), sample_stat.st_size, sample_stat.st_mtime_ns)
+        scored = {}
         
-        plt.figure(figsize=(10, 5))
-        plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (area = {roc_auc:.2f})')
-        plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-        plt.xlabel('False Positive Rate')
-        plt.ylabel('True Positive Rate')
-        plt.title('Receiver Operating Characteristic')
-        plt.legend(loc="lower right")
-        roc_buf = BytesIO()
-        plt.savefig(roc_buf, format='png')
-        plt.close()
+        def score_sample():
+            """Read and score the sample once, only when a chart actually has to be drawn"""
+            if not scored:
+                df = pd.read_csv(DATA_SAMPLE_PATH)
+                X = df.drop('stroke', axis=1)
+                scored['y'] = df['stroke']
+                scored['y_scores'] = entry.model.predict_proba(X)[:, 1]
+                scored['y_pred'] = entry.model.predict(X)
+            return scored
         
-        # Confusion Matrix
-        y_pred = model.predict(X)
-        cm = confusion_matrix(y, y_pred)
+        def draw_roc(fig, ax):
+            data = score_sample()
+            fpr, tpr, _ = roc_curve(data['y'], data['y_scores'])
+            roc_auc = auc(fpr, tpr)
+            
+            ax.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (area = {roc_auc:.2f})')
+            ax.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
+            ax.set_xlabel('False Positive Rate')
+            ax.set_ylabel('True Positive Rate')
+            ax.set_title('Receiver Operating Characteristic')
+            ax.legend(loc="lower right")
         
-        plt.figure(figsize=(6, 6))
-        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-                xticklabels=target_names, yticklabels=target_names)
-        plt.title('Confusion Matrix')
-        plt.ylabel('Actual')
-        plt.xlabel('Predicted')
-        cm_buf = BytesIO()
-        plt.savefig(cm_buf, format='png')
-        plt.close()
+        def draw_confusion_matrix(fig, ax):
+            data = score_sample()
+            cm = confusion_matrix(data['y'], data['y_pred'])
+            
+            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax,
+                    xticklabels=target_names, yticklabels=target_names)
+            ax.set_title('Confusion Matrix')
+            ax.set_ylabel('Actual')
+            ax.set_xlabel('Predicted')
         
         return {
-            "roc_curve": roc_buf.getvalue(),
-            "confusion_matrix": cm_buf.getvalue()
+            "roc_curve": chart_cache.png("performance_roc", cache_key, draw_roc, figsize=(10, 5)),
+            "confusion_matrix": chart_cache.png("performance_confusion_matrix", cache_key, draw_confusion_matrix,
+                                                figsize=(6, 6))
         }
     except Exception as e:
         raise ValueError(f"Performance visualization failed: {str(e)}")
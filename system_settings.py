@@ -0,0 +1,49 @@
+import json
+import os
+from pathlib import Path
+
+# Configuration
+current_dir = Path(__file__).parent
+SETTINGS_PATH = current_dir / "system_settings.json"
+
+# Matches the "High-Risk Alert Threshold" shown on the System Settings page
+DEFAULT_RISK_THRESHOLD = 0.15
+
+_cache = {"mtime": None, "settings": {}}
+
+def load_settings():
+    """Read persisted settings, re-reading the file only when it changes"""
+    try:
+        mtime = SETTINGS_PATH.stat().st_mtime
+    except FileNotFoundError:
+        return {}
+
+    if mtime != _cache["mtime"]:
+        with open(SETTINGS_PATH, encoding="utf-8") as f:
+            _cache["settings"] = json.load(f)
+        _cache["mtime"] = mtime
+    return _cache["settings"]
+
+def get_risk_threshold():
+    """Probability at or above which a patient is labelled High Risk"""
+    threshold = float(load_settings().get("high_risk_threshold", DEFAULT_RISK_THRESHOLD))
+    if not 0.0 < threshold < 1.0:
+        raise ValueError(f"High-risk threshold must be between 0 and 1, got {threshold}")
+    return threshold
+
+def save_settings(updates):
+    """Merge `updates` into the settings file (atomic replace)"""
+    settings = dict(load_settings())
+    settings.update(updates)
+    tmp_path = SETTINGS_PATH.with_name(f"{SETTINGS_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+    os.replace(tmp_path, SETTINGS_PATH)
+    return settings
+
+def save_risk_threshold(threshold):
+    """Persist the High-Risk Alert Threshold used by predict_stroke_risk"""
+    threshold = float(threshold)
+    if not 0.0 < threshold < 1.0:
+        raise ValueError(f"High-risk threshold must be between 0 and 1, got {threshold}")
+    save_settings({"high_risk_threshold": threshold})
@@ -0,0 +1,37 @@
+"""Export the shipped XGBoost pickle to the native format and load it back"""
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+pytest.importorskip("pycaret")
+pytest.importorskip("xgboost")
+
+from export_native_model import export
+from feature_pipeline import feature_pipeline
+from model_registry import MODEL_FILES, NativeXGBoostModel, manifest_path_for
+
+CHECK_DATA = REPO_DIR / "stroke_data_smoted_scaled_for_pycaret.csv"
+
+@pytest.fixture
+def model_copy(tmp_path):
+    """The shipped pickle in a scratch directory, so the export never lands next to the real one"""
+    path = tmp_path / MODEL_FILES["XGBoost"]
+    shutil.copy(REPO_DIR / MODEL_FILES["XGBoost"], path)
+    return path
+
+def test_export_shipped_pickle(model_copy):
+    manifest = export(model_copy, check_data=CHECK_DATA)
+
+    assert manifest["pipeline_steps"] == ["numerical_imputer", "categorical_imputer", "clean_column_names"]
+    assert set(manifest["fill_values"]) == set(manifest["feature_names"])
+    assert manifest["parity_max_abs_diff"] <= 1e-5
+    assert manifest["feature_pipeline"]["fingerprint"] == feature_pipeline.fingerprint
+    assert (model_copy.parent / manifest["model_file"]).exists()
+
+    native = NativeXGBoostModel.load(manifest_path_for(model_copy))
+    assert native.feature_names == manifest["feature_names"]
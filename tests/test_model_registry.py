@@ -0,0 +1,31 @@
+"""Native model manifests are checked against the live feature pipeline"""
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+
+from feature_pipeline import MODEL_COLUMNS, feature_pipeline
+from model_registry import NativeXGBoostModel
+
+def manifest(fingerprint):
+    return {
+        "objective": "binary:logistic",
+        "feature_names": MODEL_COLUMNS,
+        "pipeline_steps": [],
+        "fill_values": {},
+        "feature_pipeline": {"fingerprint": fingerprint}
+    }
+
+def test_matching_feature_pipeline_loads():
+    model = NativeXGBoostModel(None, manifest(feature_pipeline.fingerprint))
+    assert model.feature_names == MODEL_COLUMNS
+
+def test_changed_feature_pipeline_is_refused():
+    with pytest.raises(ValueError, match="feature pipeline"):
+        NativeXGBoostModel(None, manifest("0" * 16))
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+METRIC_NAMES = ['precision', 'recall', 'f1_score', 'specificity', 'alert_rate']
+
+class ThresholdSweep:
+    """Decision-threshold metrics for every candidate cut, from one sort of the scores
+
+    Scores are sorted once (O(n log n)); a cumulative pass then gives true and
+    false positive counts for "flag if score >= t" at every distinct score t.
+    Looking up any threshold afterwards is a binary search, so an interactive
+    slider never re-scores or re-sorts anything.
+    """
+
+    def __init__(self, y, scores):
+        y = np.asarray(y).astype(bool)
+        scores = np.asarray(scores, dtype=np.float64)
+        if y.shape != scores.shape:
+            raise ValueError("y and scores must have the same length")
+
+        order = np.argsort(-scores, kind="mergesort")
+        sorted_scores = scores[order]
+        tp = np.cumsum(y[order])
+        fp = np.cumsum(~y[order])
+
+        # Keep the last position of each run of equal scores: ties are flagged together
+        last_of_run = np.r_[sorted_scores[1:] != sorted_scores[:-1], True] if len(scores) else np.array([], bool)
+        self.thresholds = sorted_scores[last_of_run]   # descending
+        self.tp = tp[last_of_run]
+        self.fp = fp[last_of_run]
+        self.n = len(scores)
+        self.positives = int(y.sum())
+        self.negatives = self.n - self.positives
+        self._metrics = self._compute(self.tp, self.fp)
+
+    def _compute(self, tp, fp):
+        """Metric arrays for matching arrays of tp/fp counts"""
+        tp = np.asarray(tp, dtype=np.float64)
+        fp = np.asarray(fp, dtype=np.float64)
+        flagged = tp + fp
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(flagged > 0, tp / flagged, 0.0)
+            recall = tp / self.positives if self.positives else np.zeros_like(tp)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        return {
+            'precision': precision,
+            'recall': recall,
+            'f1_score': f1,
+            'specificity': (self.negatives - fp) / self.negatives if self.negatives else np.zeros_like(fp),
+            'alert_rate': flagged / self.n if self.n else np.zeros_like(tp)
+        }
+
+    def _counts_at(self, thresholds):
+        """tp/fp for 'score >= t' at arbitrary thresholds via binary search"""
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+        # Index of the smallest distinct score that is still >= t (-1 when nothing is flagged)
+        idx = np.searchsorted(-self.thresholds, -thresholds, side='right') - 1
+        flagged = idx >= 0
+        safe = np.clip(idx, 0, None)
+        tp = np.where(flagged, self.tp[safe] if len(self.tp) else 0, 0)
+        fp = np.where(flagged, self.fp[safe] if len(self.fp) else 0, 0)
+        return thresholds, tp, fp
+
+    def at(self, threshold):
+        """Metrics (plus tp/fp) for a single threshold"""
+        frame = self.at_many([threshold])
+        return {key: values[0] for key, values in frame.items()}
+
+    def at_many(self, thresholds):
+        """Metric arrays for a list of thresholds"""
+        thresholds, tp, fp = self._counts_at(thresholds)
+        result = {'threshold': thresholds, 'tp': tp, 'fp': fp}
+        result.update(self._compute(tp, fp))
+        return result
+
+    def best(self, metric='f1_score'):
+        """Distinct-score threshold that maximises `metric`"""
+        i = int(np.argmax(self._metrics[metric]))
+        return float(self.thresholds[i])
+
+    def to_frame(self):
+        """All candidate thresholds with their metrics, highest threshold first"""
+        return pd.DataFrame({'threshold': self.thresholds, 'tp': self.tp, 'fp': self.fp, **self._metrics})
@@ -0,0 +1,167 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import stroke_predictor_pkl as predictor
+from feature_pipeline import feature_pipeline
+
+# Fields the what-if grid can vary, with their default sweep (inside validate_input's bounds)
+GRID_AXES = {
+    'age': np.arange(20, 91, 5, dtype=np.float64),
+    'bmi': np.arange(15, 45.1, 2.5),
+    'avg_glucose_level': np.arange(60, 281, 20, dtype=np.float64)
+}
+AXIS_LABELS = {'age': "Age (years)", 'bmi': "BMI", 'avg_glucose_level': "Glucose (mg/dL)"}
+# Upper bound on scored rows per grid, to keep one call interactive
+MAX_GRID_POINTS = 50000
+
+class RiskSurface:
+    """High Risk probabilities over the Cartesian grid of the swept fields
+
+    probabilities[i, j, k] is the risk with the first axis at axes[0][i], the
+    second at axes[1][j] and so on, every other field held at the base patient's
+    value.
+    """
+
+    def __init__(self, fields, axes, probabilities, base_data, threshold):
+        self.fields = list(fields)
+        self.axes = [np.asarray(axis) for axis in axes]
+        self.probabilities = probabilities
+        self.base_data = dict(base_data)
+        self.threshold = threshold
+
+    def __len__(self):
+        return self.probabilities.size
+
+    def _index(self, field, value):
+        """Position of the grid value nearest to `value` on `field`'s axis"""
+        axis = self.axes[self.fields.index(field)]
+        return int(np.abs(axis - value).argmin())
+
+    def at(self, **values):
+        """Risk at the grid point nearest to the given field values (others at the base patient)"""
+        index = tuple(self._index(field, values.get(field, self.base_data[field])) for field in self.fields)
+        return float(self.probabilities[index])
+
+    def slice(self, x, y, **fixed):
+        """2-D risk table with `y` down the rows and `x` across the columns
+
+        Any remaining swept field is held at the grid value nearest to `fixed`
+        (default: the base patient's own value, which is always on the grid).
+        """
+        index = []
+        for field in self.fields:
+            if field in (x, y):
+                index.append(slice(None))
+            else:
+                index.append(self._index(field, fixed.get(field, self.base_data[field])))
+        table = self.probabilities[tuple(index)]
+        if self.fields.index(y) > self.fields.index(x):
+            table = table.T
+        return pd.DataFrame(table, index=pd.Index(self.axes[self.fields.index(y)], name=y),
+                            columns=pd.Index(self.axes[self.fields.index(x)], name=x))
+
+    def to_frame(self):
+        """Long format: one row per grid point with the swept values and its risk"""
+        mesh = np.meshgrid(*self.axes, indexing='ij')
+        frame = pd.DataFrame({field: values.ravel() for field, values in zip(self.fields, mesh)})
+        frame['probability_raw'] = self.probabilities.ravel()
+        frame['high_risk'] = frame['probability_raw'] >= self.threshold
+        return frame
+
+def grid_axes(base_data, ranges=None):
+    """Sweep values per field: the given (or default) values plus the patient's own"""
+    ranges = ranges or {}
+    axes = {}
+    for field, default in GRID_AXES.items():
+        values = np.asarray(ranges.get(field, default), dtype=np.float64)
+        axes[field] = np.unique(np.append(values, float(base_data[field])))
+    return axes
+
+def what_if_grid(base_data, ranges=None, threshold=None):
+    """Score every combination of age, BMI and glucose for one patient in a single model call
+
+    `ranges` maps any of GRID_AXES' fields to the values to sweep; fields not
+    given use the default sweep. The patient's own values are always added, so
+    slices through their current profile are exact.
+    """
+    predictor.validate_input(base_data)
+    if threshold is None:
+        threshold = predictor.get_risk_threshold()
+
+    axes = grid_axes(base_data, ranges)
+    shape = tuple(len(values) for values in axes.values())
+    n_points = int(np.prod(shape))
+    if n_points > MAX_GRID_POINTS:
+        raise ValueError(f"What-if grid has {n_points:,} points; the limit is {MAX_GRID_POINTS:,}")
+
+    for field, values in axes.items():
+        errors = predictor.field_errors({field: values.min()}) + predictor.field_errors({field: values.max()})
+        if errors:
+            raise ValueError(f"What-if range outside model limits: {errors[0]}")
+
+    # Encode the base patient once, then overwrite only the swept columns for the whole grid
+    matrix = np.tile(feature_pipeline.transform_one(base_data), (n_points, 1))
+    mesh = np.meshgrid(*axes.values(), indexing='ij')
+    for field, values in zip(axes, mesh):
+        feature_pipeline.patch(matrix, field, values.ravel())
+
+    _, probabilities, threshold = predictor.score_probabilities(feature_pipeline.to_frame(matrix), threshold)
+    return RiskSurface(axes.keys(), axes.values(), probabilities[:, 1].reshape(shape), base_data, threshold)
+
+class ScenarioSession:
+    """A base patient encoded once; each what-if patches only the columns it changes
+
+    Only the changed fields are validated, and a slider move costs one column
+    write (two for age: the scaled value and its age-group bit) plus a model
+    call, which the prediction cache answers for scenarios already seen.
+    """
+
+    def __init__(self, base_data):
+        predictor.validate_input(base_data)
+        self.base_data = dict(base_data)
+        self.base_row = feature_pipeline.transform_one(self.base_data)
+        self.base_row.flags.writeable = False
+        self.base_probability = float(predictor.predict_proba_cached(self.base_row)[1])
+        self._row = self.base_row.copy()
+        self._applied = set()
+        # The working row is shared state; one scenario at a time
+        self._lock = threading.Lock()
+
+    def score(self, changes, threshold=None):
+        """Risk with `changes` applied to the base patient; same shape as generate_what_if_scenario"""
+        errors = predictor.field_errors(changes)
+        unknown = [field for field in changes if field not in feature_pipeline.field_columns]
+        if unknown:
+            errors.append(f"Unknown field(s): {', '.join(unknown)}")
+        if errors:
+            raise ValueError(" | ".join(errors))
+
+        with self._lock:
+            # Put back the base columns of fields the previous scenario changed but this one doesn't
+            for field in self._applied - set(changes):
+                columns = feature_pipeline.field_columns[field]
+                self._row[columns] = self.base_row[columns]
+            for field, value in changes.items():
+                feature_pipeline.patch(self._row, field, value)
+            self._applied = set(changes)
+            probabilities = predictor.predict_proba_cached(self._row)
+
+        if threshold is None:
+            threshold = predictor.get_risk_threshold()
+        prediction = int(probabilities[1] >= threshold)
+        return {
+            "status": "success",
+            "original_risk": self.base_probability,
+            "new_risk": float(probabilities[1]),
+            "risk_change": float(probabilities[1]) - self.base_probability,
+            "details": {
+                "prediction": prediction,
+                "probabilities": probabilities.tolist(),
+                "risk_level": "High Risk" if prediction == 1 else "Low Risk",
+                "probability_percent": f"{probabilities[1]*100:.1f}%",
+                "probability_raw": float(probabilities[1]),
+                "threshold": threshold
+            }
+        }